@@ -0,0 +1,140 @@
+## Replay many game records at once.
+## Positions of all games are numpy uint64 bitboards (8x8 board only) and
+## every move of a ply is applied to all games together, so the replay
+## costs a few numpy operations per ply instead of a python loop per move.
+## Moves are square indices (row*8 + col) and negative values mean the
+## end of the game (see wtb_reader.toSquares).
+
+import numpy as np
+
+import bitboard
+from othello import *
+
+
+NUM_SQUARES = 64
+MAX_MOVES = 60
+
+# (shift amount, mask) of the 8 directions as uint64
+_DIRECTIONS = tuple( (amount, np.uint64(mask))
+                     for amount, mask in bitboard.getGeometry(8)[1] )
+_ONE = np.uint64(1)
+_ZERO = np.uint64(0)
+
+
+def _shift(x, amount, mask):
+    if amount > 0:
+        return (x << np.uint64(amount)) & mask
+    else:
+        return (x >> np.uint64(-amount)) & mask
+
+def getFlipsBatch(players, opponents, squares):
+    """Get bitmasks of discs to be reversed if each player puts on the
+       square (arrays of the same length; 0 for illegal moves)."""
+    valid = (squares >= 0) & (squares < NUM_SQUARES)
+    moves = np.where(valid, _ONE << np.clip(squares, 0, NUM_SQUARES-1)
+                                       .astype(np.uint64), _ZERO)
+    moves &= ~(players | opponents)
+    flips = np.zeros_like(players)
+    for amount, mask in _DIRECTIONS:
+        o = opponents & mask
+        # run of opponent's discs next to the move
+        line = _shift(moves, amount, o)
+        for _ in range(5):
+            line |= _shift(line, amount, o)
+        # the run is reversed if the player's disc bounds it
+        bounded = _shift(line, amount, mask) & players
+        flips |= np.where(bounded != _ZERO, line, _ZERO)
+    return flips
+
+def unpackBitboards(x):
+    """Unpack uint64 bitboards (N,) into (N, 64) uint8 arrays of 0/1."""
+    x = np.ascontiguousarray(x, dtype="<u8")
+    return np.unpackbits(x.view(np.uint8).reshape(-1, 8), axis=1,
+                         bitorder="little")
+
+def replayGames(squares):
+    """Replay games of (N, 60) moves and get (positions, sides, passes,
+       num_moves, valid).
+       positions: (N, 61, 64) int8 positions before each move (the last
+                  one is after the 60th move), whose discs are 1 (black),
+                  -1 (white) or 0 (blank) as normalizeDisc. Positions after
+                  the end of the game repeat the final position.
+       sides:     (N, 61) int8 player who made the move (DARK_PLAYER or
+                  LIGHT_PLAYER), -1 after the end of the game
+       passes:    (N, 61) bool, True if the player expected to move had
+                  to pass before the move
+       num_moves: (N,) number of moves replayed
+       valid:     (N,) bool, False if the record has an illegal move
+                  (it is replayed until the move)"""
+    squares = np.asarray(squares)
+    if squares.ndim != 2:
+        raise ValueError("moves must be (number of games, moves) array")
+    num_games, length = squares.shape
+    squares = squares.astype(np.int16)
+
+    positions = np.empty( (num_games, length+1, NUM_SQUARES), dtype=np.int8 )
+    sides = np.full( (num_games, length+1), -1, dtype=np.int8 )
+    passes = np.zeros( (num_games, length+1), dtype=bool )
+    num_moves = np.zeros(num_games, dtype=np.int16)
+    valid = np.ones(num_games, dtype=bool)
+
+    # initial position (same as Othello)
+    black = np.full(num_games, (1 << 28) | (1 << 35), dtype=np.uint64)
+    white = np.full(num_games, (1 << 27) | (1 << 36), dtype=np.uint64)
+    # player to move is dark at first
+    dark_to_move = np.ones(num_games, dtype=bool)
+    playing = np.ones(num_games, dtype=bool)
+
+    for ply in range(length):
+        positions[:, ply] = unpackBitboards(black).view(np.int8) - \
+                            unpackBitboards(white).view(np.int8)
+        sq = squares[:, ply]
+        playing &= sq >= 0
+        if not playing.any():
+            positions[:, ply+1:] = positions[:, ply:ply+1]
+            break
+
+        players = np.where(dark_to_move, black, white)
+        opponents = np.where(dark_to_move, white, black)
+        flips = getFlipsBatch(players, opponents, sq)
+        # the player to move passed if the move is the opponent's one
+        passed = playing & (flips == _ZERO)
+        if passed.any():
+            flips = np.where(passed, getFlipsBatch(opponents, players, sq),
+                             flips)
+            illegal = passed & (flips == _ZERO)
+            valid &= ~illegal
+            playing &= ~illegal
+            dark_to_move ^= passed
+        flips = np.where(playing, flips, _ZERO)
+        moves = np.where(playing, _ONE << np.clip(sq, 0, NUM_SQUARES-1)
+                                            .astype(np.uint64), _ZERO)
+
+        dark_moves = playing & dark_to_move
+        light_moves = playing & ~dark_to_move
+        black = np.where(dark_moves, black | flips | moves,
+                         np.where(light_moves, black ^ flips, black))
+        white = np.where(light_moves, white | flips | moves,
+                         np.where(dark_moves, white ^ flips, white))
+
+        sides[:, ply] = np.where(playing, np.where(dark_to_move, DARK_PLAYER,
+                                                   LIGHT_PLAYER), -1)
+        passes[:, ply] = passed & playing
+        num_moves += playing
+        dark_to_move ^= playing
+    else:
+        positions[:, length] = unpackBitboards(black).view(np.int8) - \
+                               unpackBitboards(white).view(np.int8)
+
+    return (positions, sides, passes, num_moves, valid)
+
+def recordToSquares(record):
+    """Convert a record of "row-col" moves ("---" for the end) to the list
+       of 60 squares (-1 for the end)."""
+    squares = [-1] * MAX_MOVES
+    for i, m in enumerate(record[:MAX_MOVES]):
+        if m == "---":
+            break
+        row, col = map(int, m.split("-"))
+        squares[i] = row*8 + col
+    return squares
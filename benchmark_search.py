@@ -0,0 +1,101 @@
+## Compare parallel searches with different numbers of workers
+## on a fixed suite of positions.
+## Positions are made by random plays from a fixed seed, so the suite is
+## the same in every run.
+
+import time
+import random
+import argparse
+
+from othello import *
+from othello_models import CornerWeightedMinMaxOthelloAgent
+
+
+def makePositions(num_positions, seed=20210317, min_moves=10, max_moves=40):
+    """Make a list of (state, player to move) by random plays."""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < num_positions:
+        state = Othello(8).getState()
+        player = DARK_PLAYER
+        num_moves = rng.randint(min_moves, max_moves)
+        for _ in range(num_moves):
+            actions = Othello.smActions(player, state)
+            if actions[0] == "pass":
+                if Othello.smActions(1-player, state)[0] == "pass":
+                    break
+            else:
+                state = Othello.smResult(state, rng.choice(actions), player)
+            player = 1 - player
+        if not Othello.smTerminal(state):
+            positions.append( (state, player) )
+    return positions
+
+
+def runSuite(positions, depth, workers, mode, backend):
+    """Search all positions and return (seconds, nodes, results)."""
+    env = Othello(8, backend=backend)
+    agent = CornerWeightedMinMaxOthelloAgent(
+        env, workers=workers if workers > 1 else None, parallel_mode=mode)
+    elapsed = 0
+    nodes = 0
+    results = []
+    try:
+        for state, player in positions:
+            agent.setOrder(player)
+            agent.debug_counter = 0
+            start = time.perf_counter()
+            if workers > 1:
+                result = agent.parallelSearch(state, depth)
+            else:
+                result = agent.search(state, depth)
+            elapsed += time.perf_counter() - start
+            nodes += agent.debug_counter
+            results.append(result)
+    finally:
+        agent.close()
+    return (elapsed, nodes, results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark parallel search on a fixed position suite"
+    )
+    parser.add_argument("-d", "--depth",
+                        type=int,
+                        default=6,
+                        help="depth of search")
+    parser.add_argument("-n", "--num-positions",
+                        type=int,
+                        default=8,
+                        help="number of positions in the suite")
+    parser.add_argument("-w", "--workers",
+                        type=int,
+                        nargs="+",
+                        default=[1, 2, 4, 8, 16],
+                        help="numbers of workers to compare")
+    parser.add_argument("-m", "--mode",
+                        choices=["root", "smp"],
+                        nargs="+",
+                        default=["smp", "root"],
+                        help="parallel modes to compare")
+    parser.add_argument("--bitboard",
+                        action="store_true",
+                        help="use bitboard engine")
+    args = parser.parse_args()
+
+    backend = "bitboard" if args.bitboard else "numpy"
+    positions = makePositions(args.num_positions)
+    base_time, base_nodes, base_results = runSuite(positions, args.depth, 1,
+                                                   "root", backend)
+    print(f"{'sequential':12s} {base_time:8.2f} s {base_nodes:10d} nodes")
+    for mode in args.mode:
+        for workers in args.workers:
+            if workers <= 1:
+                continue
+            elapsed, nodes, results = runSuite(positions, args.depth, workers,
+                                               mode, backend)
+            same = sum(r == b for r, b in zip(results, base_results))
+            print(f"{mode:4s} {workers:3d} wk {elapsed:8.2f} s "
+                  f"{nodes:10d} nodes  speedup {base_time/elapsed:5.2f}  "
+                  f"same results {same}/{len(positions)}")
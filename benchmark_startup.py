@@ -0,0 +1,67 @@
+## Measure startup time of the entry point scripts.
+## Each script is imported in a fresh python process (the scripts do
+## nothing more on import), and heavy libraries loaded on the way
+## are reported, since they dominate the time of short runs.
+
+import sys
+import time
+import argparse
+import subprocess
+
+
+ENTRY_POINTS = [
+    "play_othello",
+    "othello_simulator",
+    "record_creator",
+]
+
+# libraries which should be loaded only when they are really needed
+HEAVY_MODULES = ["tensorflow", "matplotlib"]
+
+
+def measure(module, repeat):
+    """Get (list of seconds, heavy modules loaded) of importing module."""
+    code = f"import sys, {module}; " + \
+           f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    times = []
+    loaded = ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", code],
+                                capture_output=True, text=True)
+        times.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()[-1]
+            raise RuntimeError(f"failed to import {module}: {error}")
+        loaded = result.stdout.strip()
+    return (times, loaded)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure startup time of entry point scripts"
+    )
+    parser.add_argument("-n", "--repeat",
+                        type=int,
+                        default=5,
+                        help="number of runs of each script")
+    parser.add_argument("modules",
+                        nargs="*",
+                        default=ENTRY_POINTS,
+                        help="modules to import (default: all entry points)")
+    args = parser.parse_args()
+
+    base_times, _ = measure("os", args.repeat)
+    base = sorted(base_times)[len(base_times)//2]
+    print(f"{'python itself':20s} median {base*1000:8.1f} ms")
+    for module in args.modules:
+        try:
+            times, loaded = measure(module, args.repeat)
+        except RuntimeError as e:
+            print(f"{module:20s} {e}")
+            continue
+        median = sorted(times)[len(times)//2]
+        print(f"{module:20s} median {median*1000:8.1f} ms "
+              f"(+{(median-base)*1000:.1f} ms) "
+              f"min {min(times)*1000:.1f} ms "
+              f"heavy modules: {loaded or 'none'}")
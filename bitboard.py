@@ -0,0 +1,159 @@
+## Bitboard primitives for the othello board.
+## A board is a pair of integers (one per color) whose bit (row*size + col)
+## is set when a disc of that color is on (row, col).
+## All functions work on plain python integers, so any board size is
+## supported, although the 8x8 board fits in two 64-bit words.
+
+
+_geometries = {}
+
+def getGeometry(size=8):
+    """Get (full mask, shift table) of the board of the size (cached)."""
+    try:
+        return _geometries[size]
+    except KeyError:
+        pass
+    full = (1 << (size*size)) - 1
+    not_first_col = 0   # squares except column 0
+    not_last_col = 0    # squares except column size-1
+    for row in range(size):
+        for col in range(size):
+            if col != 0:
+                not_first_col |= 1 << (row*size + col)
+            if col != size-1:
+                not_last_col |= 1 << (row*size + col)
+    # (shift amount, mask applied after shifting) for each direction.
+    # positive amount means left shift (toward larger square index)
+    directions = (
+        (1, not_first_col),                # right
+        (-1, not_last_col),                # left
+        (size, full),                      # bottom
+        (-size, full),                     # top
+        (size+1, not_first_col & full),    # right bottom
+        (size-1, not_last_col & full),     # left bottom
+        (-(size-1), not_first_col),        # right top
+        (-(size+1), not_last_col),         # left top
+    )
+    _geometries[size] = (full, directions)
+    return _geometries[size]
+
+
+def shift(x, amount, mask):
+    """Shift all discs in x by one step in a direction."""
+    if amount > 0:
+        return (x << amount) & mask
+    else:
+        return (x >> -amount) & mask
+
+
+def getMoves(player, opponent, size=8):
+    """Get the bitmask of all legal moves for player."""
+    directions = getGeometry(size)[1]
+    moves = 0
+    for amount, mask in directions:
+        # flood fill from player's discs over opponent's discs
+        o = opponent & mask
+        if amount > 0:
+            t = (player << amount) & o
+            for _ in range(size-3):
+                t |= (t << amount) & o
+            moves |= (t << amount) & mask
+        else:
+            t = (player >> -amount) & o
+            for _ in range(size-3):
+                t |= (t >> -amount) & o
+            moves |= (t >> -amount) & mask
+    return moves & ~(player | opponent)
+
+
+def getFlips(player, opponent, sq, size=8):
+    """Get the bitmask of discs to be reversed if player puts on sq."""
+    directions = getGeometry(size)[1]
+    move = 1 << sq
+    if (player | opponent) & move:
+        return 0
+    flips = 0
+    for amount, mask in directions:
+        line = 0
+        if amount > 0:
+            x = (move << amount) & mask
+            while x & opponent:
+                line |= x
+                x = (x << amount) & mask
+        else:
+            x = (move >> -amount) & mask
+            while x & opponent:
+                line |= x
+                x = (x >> -amount) & mask
+        if x & player:
+            flips |= line
+    return flips
+
+
+def popcount(x):
+    """Count up set bits (discs)."""
+    return x.bit_count()
+
+
+def iterBits(x):
+    """Iterate over indices of set bits in ascending order."""
+    while x:
+        low = x & -x
+        yield low.bit_length() - 1
+        x ^= low
+
+
+def flipVertical(x, size=8):
+    """Flip the board upside down (row r goes to row size-1-r)."""
+    row_mask = (1 << size) - 1
+    y = 0
+    for row in range(size):
+        y |= ((x >> (row*size)) & row_mask) << ((size-1-row)*size)
+    return y
+
+def mirrorHorizontal(x, size=8):
+    """Mirror the board left side right (col c goes to col size-1-c)."""
+    if size == 8:
+        # swap bits, pairs and nibbles in each byte (row)
+        k1 = 0x5555555555555555
+        k2 = 0x3333333333333333
+        k4 = 0x0F0F0F0F0F0F0F0F
+        x = ((x >> 1) & k1) | ((x & k1) << 1)
+        x = ((x >> 2) & k2) | ((x & k2) << 2)
+        return ((x >> 4) & k4) | ((x & k4) << 4)
+    y = 0
+    for sq in iterBits(x):
+        row, col = divmod(sq, size)
+        y |= 1 << (row*size + size-1-col)
+    return y
+
+def flipDiagonal(x, size=8):
+    """Transpose the board ((row, col) goes to (col, row))."""
+    if size == 8:
+        # swap 4x4, 2x2 and 1x1 blocks across the diagonal
+        k1 = 0x5500550055005500
+        k2 = 0x3333000033330000
+        k4 = 0x0F0F0F0F00000000
+        t = k4 & (x ^ (x << 28))
+        x ^= t ^ (t >> 28)
+        t = k2 & (x ^ (x << 14))
+        x ^= t ^ (t >> 14)
+        t = k1 & (x ^ (x << 7))
+        return x ^ t ^ (t >> 7)
+    y = 0
+    for sq in iterBits(x):
+        row, col = divmod(sq, size)
+        y |= 1 << (col*size + row)
+    return y
+
+def transform(x, symmetry, size=8):
+    """Apply one of 8 symmetries of the square board (0-7) to x.
+       Bits of symmetry select mirroring (1), flipping (2) and transposing
+       (4), applied in this order."""
+    if symmetry & 1:
+        x = mirrorHorizontal(x, size)
+    if symmetry & 2:
+        x = flipVertical(x, size)
+    if symmetry & 4:
+        x = flipDiagonal(x, size)
+    return x
@@ -0,0 +1,38 @@
+## Build the cached datasets of positions from game records.
+## Trainers open the same datasets (see position_dataset.py), so running
+## this beforehand is optional.
+
+import argparse
+
+from position_dataset import openDataset, DEFAULT_CACHE_DIR
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Replay game records and cache the positions"
+    )
+    parser.add_argument("sources",
+                        nargs="+",
+                        help="wtb or csv files of records "
+                             "(e.g. othello_data/WTH_*.wtb)")
+    parser.add_argument("-d", "--cache-dir",
+                        default=DEFAULT_CACHE_DIR,
+                        help="directory of the cached datasets")
+    parser.add_argument("--normalize-state",
+                        action="store_true",
+                        help="transform positions by normalizeState")
+    parser.add_argument("--shard-size",
+                        type=int,
+                        default=1<<16,
+                        help="number of positions in a shard")
+    parser.add_argument("--rebuild",
+                        action="store_true",
+                        help="build the datasets even if they are cached")
+    args = parser.parse_args()
+
+    dataset = openDataset(args.sources, args.cache_dir, args.normalize_state,
+                          args.shard_size, args.rebuild)
+    for manifest in dataset.manifests:
+        print(f"{manifest['source']}: {manifest['num_games']} games "
+              f"({manifest['num_broken_games']} broken), "
+              f"{manifest['num_positions']} positions")
@@ -0,0 +1,68 @@
+## Build an opening book from WTH csv files.
+## The first moves of all records are replayed and counted with the final
+## results of the games (the score column is the number of dark discs).
+
+import csv
+import argparse
+
+from othello import *
+from othello_simulator import searchMove
+from opening_book import OpeningBook
+
+
+def readRecords(csvfiles):
+    """Read (list of squares, disc differential of dark) from csv files."""
+    records = []
+    for csvfile in csvfiles:
+        with open(csvfile) as f:
+            for data in csv.reader(f):
+                moves = searchMove(data)
+                if moves is None or "" in moves or not data[3].isdigit():
+                    continue
+                squares = []
+                for move in toZeroBasedMoves(moves):
+                    if move == "---":
+                        break
+                    row, col = map(int, move.split("-"))
+                    squares.append(row*8 + col)
+                records.append( (squares, 2*int(data[3]) - 64) )
+    return records
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build an opening book from game records"
+    )
+    parser.add_argument("csvfiles",
+                        nargs="+",
+                        help="csv files of records (e.g. othello_data/WTH_*.csv)")
+    parser.add_argument("-o", "--outfile",
+                        default="opening_book.npz",
+                        help="file to save the book (.npz, or position "
+                             "database for other extensions)")
+    parser.add_argument("-p", "--max-plies",
+                        type=int,
+                        default=20,
+                        help="number of moves of each record to add")
+    parser.add_argument("-m", "--min-count",
+                        type=int,
+                        default=2,
+                        help="remove moves played fewer times than this")
+    args = parser.parse_args()
+
+    book = OpeningBook(8)
+    num_records = 0
+    for squares, dark_diff in readRecords(args.csvfiles):
+        try:
+            book.addRecord(squares, dark_diff, args.max_plies)
+            num_records += 1
+        except ValueError:
+            # broken record
+            continue
+    book.prune(args.min_count)
+    if args.outfile.endswith(".npz"):
+        book.save(args.outfile)
+    else:
+        # memory-mapped position database
+        book.saveDatabase(args.outfile)
+    print(f"{num_records} records, {len(book)} positions saved in {args.outfile}")
@@ -0,0 +1,234 @@
+## Exact endgame solver working on bitboards.
+## Scores are disc differentials (player to move - opponent) of the final
+## position, where blank squares are counted for the winner.
+## The solver searches all moves to the end of the game with alpha-beta
+## pruning, ordering moves by fastest-first heuristic (fewer replies for the
+## opponent) while many squares are blank, and by parity (moves into regions
+## with an odd number of blanks first) near the end.
+
+import time
+
+import bitboard
+
+
+# Exception which will be raised when the time for solving ran out
+class SolverTimeout(Exception):
+    pass
+
+
+_quadrant_tables = {}
+
+def getQuadrants(size=8):
+    """Get bitmasks of the four quadrants of the board (cached by size)."""
+    try:
+        return _quadrant_tables[size]
+    except KeyError:
+        pass
+    half = size // 2
+    quadrants = [0, 0, 0, 0]
+    for row in range(size):
+        for col in range(size):
+            q = (row >= half) * 2 + (col >= half)
+            quadrants[q] |= 1 << (row*size + col)
+    _quadrant_tables[size] = tuple(quadrants)
+    return _quadrant_tables[size]
+
+
+class EndgameSolver():
+
+    # use fastest-first ordering when more squares than this are blank
+    FASTEST_FIRST_EMPTIES = 6
+
+    def __init__(self, size=8):
+        self.size = size
+        self.full = bitboard.getGeometry(size)[0]
+        self.quadrants = getQuadrants(size)
+        self.nodes = 0
+        self.deadline = None
+
+    def finalScore(self, player, opponent):
+        """Score of the position where the game is over."""
+        p = bitboard.popcount(player)
+        o = bitboard.popcount(opponent)
+        blanks = self.size*self.size - p - o
+        if p > o:
+            return p - o + blanks
+        elif p < o:
+            return p - o - blanks
+        else:
+            return 0
+
+    def solve(self, player, opponent, alpha=None, beta=None, timeout_ms=None):
+        """Get the exact score within the window (alpha, beta).
+           If the score is out of the window, the bound is returned."""
+        num_squares = self.size * self.size
+        if alpha is None:
+            alpha = -num_squares
+        if beta is None:
+            beta = num_squares
+        self.nodes = 0
+        if timeout_ms is not None:
+            self.deadline = time.perf_counter() + timeout_ms / 1000
+        try:
+            return self._solve(player, opponent, alpha, beta, False)
+        finally:
+            self.deadline = None
+
+    def solveWinLossDraw(self, player, opponent, timeout_ms=None):
+        """Get 1 if player to move wins, -1 if loses, 0 if draw."""
+        score = self.solve(player, opponent, -1, 1, timeout_ms)
+        return (score > 0) - (score < 0)
+
+    def bestMove(self, player, opponent, mode="exact", timeout_ms=None):
+        """Get (the best square or None for pass, score).
+           mode is "exact" (disc differential) or "wld" (win/loss/draw)."""
+        num_squares = self.size * self.size
+        if mode == "exact":
+            alpha, beta = -num_squares, num_squares
+        elif mode == "wld":
+            alpha, beta = -1, 1
+        else:
+            raise ValueError(f"Unknown mode: {mode}")
+        self.nodes = 0
+        if timeout_ms is not None:
+            self.deadline = time.perf_counter() + timeout_ms / 1000
+        try:
+            moves = bitboard.getMoves(player, opponent, self.size)
+            best_sq = None
+            if moves == 0:
+                best_score = self._solve(player, opponent, alpha, beta, False)
+            else:
+                best_score = -num_squares - 1
+            for sq in self._orderMoves(player, opponent, moves):
+                flips = bitboard.getFlips(player, opponent, sq, self.size)
+                score = -self._solve(opponent ^ flips,
+                                     player | flips | (1 << sq),
+                                     -beta, -alpha, False)
+                if score > best_score:
+                    best_sq = sq
+                    best_score = score
+                    if score > alpha:
+                        alpha = score
+                        if alpha >= beta:
+                            break
+            if mode == "wld":
+                best_score = (best_score > 0) - (best_score < 0)
+            return (best_sq, best_score)
+        finally:
+            self.deadline = None
+
+    def _orderMoves(self, player, opponent, moves):
+        """Sort squares of moves so that better ones come first."""
+        empties = ~(player | opponent) & self.full
+        num_empties = bitboard.popcount(empties)
+        squares = list(bitboard.iterBits(moves))
+        if num_empties > self.FASTEST_FIRST_EMPTIES:
+            # fastest-first: fewer replies for the opponent
+            scored = []
+            for sq in squares:
+                flips = bitboard.getFlips(player, opponent, sq, self.size)
+                replies = bitboard.getMoves(opponent ^ flips,
+                                            player | flips | (1 << sq),
+                                            self.size)
+                scored.append( (bitboard.popcount(replies), sq) )
+            scored.sort()
+            return [sq for _, sq in scored]
+        else:
+            # parity: squares in regions with odd number of blanks first
+            odd = 0
+            for q in self.quadrants:
+                if bitboard.popcount(empties & q) & 1:
+                    odd |= q
+            return [sq for sq in squares if (1 << sq) & odd] + \
+                   [sq for sq in squares if not (1 << sq) & odd]
+
+    def _solve(self, player, opponent, alpha, beta, passed):
+        self.nodes += 1
+        if self.deadline is not None and (self.nodes & 0x3FF) == 0 and \
+           time.perf_counter() > self.deadline:
+            raise SolverTimeout()
+
+        empties = ~(player | opponent) & self.full
+        num_empties = bitboard.popcount(empties)
+        if num_empties == 1:
+            return self._solveLast1(player, opponent,
+                                    empties.bit_length() - 1)
+        elif num_empties <= 3:
+            return self._solveLast3(player, opponent, alpha, beta, empties,
+                                    passed)
+
+        moves = bitboard.getMoves(player, opponent, self.size)
+        if moves == 0:
+            if passed:
+                return self.finalScore(player, opponent)
+            return -self._solve(opponent, player, -beta, -alpha, True)
+
+        best_score = -self.size*self.size - 1
+        for sq in self._orderMoves(player, opponent, moves):
+            flips = bitboard.getFlips(player, opponent, sq, self.size)
+            score = -self._solve(opponent ^ flips, player | flips | (1 << sq),
+                                 -beta, -alpha, False)
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score
+
+    def _solveLast1(self, player, opponent, sq):
+        """Score of the position with only one blank square."""
+        diff = bitboard.popcount(player) - bitboard.popcount(opponent)
+        flips = bitboard.getFlips(player, opponent, sq, self.size)
+        if flips:
+            return diff + 2*bitboard.popcount(flips) + 1
+        flips = bitboard.getFlips(opponent, player, sq, self.size)
+        if flips:
+            return diff - 2*bitboard.popcount(flips) - 1
+        # neither player can put on the last square
+        if diff > 0:
+            return diff + 1
+        elif diff < 0:
+            return diff - 1
+        return 0
+
+    def _solveLast3(self, player, opponent, alpha, beta, empties, passed):
+        """Score of the position with 2 or 3 blank squares,
+           trying blank squares directly instead of generating moves."""
+        self.nodes += 1
+        squares = list(bitboard.iterBits(empties))
+        if len(squares) == 3:
+            # parity: a square alone in its quadrant first
+            for q in self.quadrants:
+                region = empties & q
+                if region and bitboard.popcount(region) == 1:
+                    sq = region.bit_length() - 1
+                    squares.remove(sq)
+                    squares.insert(0, sq)
+                    break
+        best_score = None
+        for sq in squares:
+            flips = bitboard.getFlips(player, opponent, sq, self.size)
+            if flips == 0:
+                continue
+            new_player = player | flips | (1 << sq)
+            new_opponent = opponent ^ flips
+            if len(squares) == 2:
+                score = -self._solveLast1(new_opponent, new_player,
+                                          (empties ^ (1 << sq)).bit_length() - 1)
+            else:
+                score = -self._solveLast3(new_opponent, new_player,
+                                          -beta, -alpha, empties ^ (1 << sq),
+                                          False)
+            if best_score is None or score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        if best_score is not None:
+            return best_score
+        # no move for player
+        if passed:
+            return self.finalScore(player, opponent)
+        return -self._solveLast3(opponent, player, -beta, -alpha, empties, True)
@@ -0,0 +1,58 @@
+## Cache of evaluated scores of positions.
+## Scores are keyed by zobrist keys of positions (which include the side
+## to move) and the least recently used entry is evicted when the cache
+## is full, so positions recurring in sibling subtrees, successive moves
+## and successive games are evaluated only once.
+
+from collections import OrderedDict
+
+
+class EvaluationCache():
+
+    def __init__(self, capacity=1 << 16):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.resetStats()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def resetStats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        """Get counters of lookups and evictions."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        self.entries.clear()
+
+    def get(self, key):
+        """Get the score cached for the key, or None."""
+        try:
+            value = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Cache the score of the key, evicting the least recently used
+           entry if the cache is full."""
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
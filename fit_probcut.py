@@ -0,0 +1,115 @@
+## Fit parameters of Multi-ProbCut from positions of game records.
+## Positions are sampled from records in WTH csv files, searched with
+## shallow and deep depths by the agent, and the deep scores are regressed
+## on the shallow scores for each stage of the game.
+
+import csv
+import random
+import argparse
+
+from othello import *
+from othello_models import NumDiscMinMaxOthelloAgent, \
+                           CornerWeightedMinMaxOthelloAgent
+from othello_simulator import searchMove
+from probcut import ProbCut
+
+
+AGENTS = {
+    "numdisc": NumDiscMinMaxOthelloAgent,
+    "corner": CornerWeightedMinMaxOthelloAgent,
+}
+
+
+def samplePositions(csvfiles, num_positions, seed=0):
+    """Sample (state, player to move) from records in csv files."""
+    rng = random.Random(seed)
+    records = []
+    for csvfile in csvfiles:
+        with open(csvfile) as f:
+            for data in csv.reader(f):
+                moves = searchMove(data)
+                if moves is not None and "" not in moves:
+                    records.append(toZeroBasedMoves(moves))
+    rng.shuffle(records)
+
+    positions = []
+    for moves in records:
+        if len(positions) >= num_positions:
+            break
+        try:
+            states = getAllStatesFromRecord(moves)
+        except (ActionError, ValueError):
+            # broken record
+            continue
+        if len(states) < 2:
+            continue
+        # the player to move is the one who changed the state next
+        i = rng.randrange(len(states) - 1)
+        player = getPlayerFromStateChange(states[i], states[i+1])
+        positions.append( (states[i], player) )
+    return positions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Fit parameters of Multi-ProbCut from game records"
+    )
+    parser.add_argument("csvfiles",
+                        nargs="+",
+                        help="csv files of records (e.g. othello_data/WTH_*.csv)")
+    parser.add_argument("-o", "--outfile",
+                        default="probcut.json",
+                        help="file to save the parameters")
+    parser.add_argument("-a", "--agent",
+                        choices=AGENTS.keys(),
+                        default="corner",
+                        help="agent whose evaluation is used")
+    parser.add_argument("-c", "--checks",
+                        nargs="+",
+                        default=["3:1", "4:2", "5:1", "6:2"],
+                        help="pairs of depth:shallow depth to fit")
+    parser.add_argument("-t", "--threshold",
+                        type=float,
+                        default=1.5,
+                        help="cut when out of the window by t sigmas")
+    parser.add_argument("-n", "--num-positions",
+                        type=int,
+                        default=500,
+                        help="number of positions to sample")
+    parser.add_argument("-w", "--stage-width",
+                        type=int,
+                        default=4,
+                        help="number of discs in a stage")
+    parser.add_argument("--bitboard",
+                        action="store_true",
+                        help="use bitboard engine")
+    args = parser.parse_args()
+
+    backend = "bitboard" if args.bitboard else "numpy"
+    env = Othello(8, backend=backend)
+    agent = AGENTS[args.agent](env)
+    positions = samplePositions(args.csvfiles, args.num_positions)
+    print(f"{len(positions)} positions sampled")
+
+    checks = [tuple(map(int, c.split(":"))) for c in args.checks]
+    depths = sorted(set(d for pair in checks for d in pair))
+    # scores[depth]: score of the position searched with depth,
+    # in sight of the agent of each order
+    samples = {pair: [] for pair in checks}
+    for i, (state, player) in enumerate(positions):
+        num_discs = sum(Othello.smScore(state))
+        for order in (DARK_PLAYER, LIGHT_PLAYER):
+            agent.setOrder(order)
+            board = env.engine.smSearchBoard(state, player)
+            scores = {d: agent.search(board.copy(), d)[1] for d in depths}
+            for depth, shallow in checks:
+                samples[(depth, shallow)].append(
+                    (order, num_discs, scores[shallow], scores[depth]) )
+        if (i+1) % 50 == 0:
+            print(f"{i+1} positions searched")
+
+    probcut = ProbCut(stage_width=args.stage_width)
+    for depth, shallow in checks:
+        probcut.fit(depth, shallow, args.threshold, samples[(depth, shallow)])
+    probcut.save(args.outfile)
+    print(f"parameters saved in {args.outfile}")
@@ -0,0 +1,119 @@
+## Lazy SMP: parallel search where all processes search the same root
+## and communicate only through a transposition table in shared memory.
+## Helper processes search with iterative deepening, half of them one ply
+## deeper and each starting from a different root move, so that they fill
+## the table with results which the main search (in this process) uses.
+## The result is the one of the main search, which is stopped by nothing
+## but its depth; helpers are stopped when the main search finishes.
+
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from transposition import TranspositionTable, getBufferSize
+
+
+# state of worker processes
+_agent = None
+_memory = None
+
+def _initWorker(agent, memory_name, size_mb, stop_flag):
+    global _agent, _memory
+    _memory = shared_memory.SharedMemory(name=memory_name)
+    agent.transposition_table = TranspositionTable(size_mb, buffer=_memory.buf)
+    agent.stop_flag = stop_flag
+    _agent = agent
+
+def _helperSearch(engine, state, order, depth, helper, generation):
+    """Search the root in the helper process until depth or until it is
+       stopped, and return the number of nodes."""
+    from othello_models import SearchTimeout
+    agent = _agent
+    table = agent.transposition_table
+    if agent.order != order:
+        # the shared table is cleared by the main process
+        agent.transposition_table = None
+        agent.setOrder(order)
+        agent.transposition_table = table
+    table.generation = generation
+    if agent.move_orderer is not None:
+        agent.move_orderer.newSearch()
+    agent.debug_counter = 0
+    agent.deadline = np.inf   # enables checking the stop flag
+    root = engine.smSearchBoard(state, order)
+    actions = root.actions()
+    first_action = actions[helper % len(actions)]
+    try:
+        for d in range(1, depth + 1 + helper % 2):
+            agent.search(root.copy(), d, first_action=first_action)
+    except SearchTimeout:
+        # the main search finished
+        pass
+    finally:
+        agent.deadline = None
+    return agent.debug_counter
+
+
+class LazySMPSearch():
+
+    def __init__(self, agent, workers=None):
+        self.agent = agent
+        self.workers = workers or multiprocessing.cpu_count()
+        self.stop_flag = multiprocessing.Value("b", 0)
+        self.executor = None
+        self.memory = None
+        # the agent's own table is put back on close
+        self.own_table = agent.transposition_table
+
+    def close(self):
+        """Shut down the helper processes and free the shared table."""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        if self.memory is not None:
+            self.agent.transposition_table.release()
+            self.agent.transposition_table = self.own_table
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
+
+    def start(self):
+        """Put the agent's table into shared memory and start helpers."""
+        size_mb = 16
+        if self.own_table is not None:
+            size_mb = self.own_table.size_mb
+        self.memory = shared_memory.SharedMemory(
+            create=True, size=getBufferSize(size_mb))
+        table = TranspositionTable(size_mb, buffer=self.memory.buf)
+        table.clear()
+        self.agent.transposition_table = table
+        if self.workers > 1:
+            self.executor = ProcessPoolExecutor(
+                self.workers - 1, initializer=_initWorker,
+                initargs=(self.agent, self.memory.name, size_mb,
+                          self.stop_flag))
+
+    def search(self, state, depth):
+        """Find the best action and its score of the agent's player within
+           depth, with helpers filling the shared table."""
+        agent = self.agent
+        if self.memory is None:
+            self.start()
+        table = agent.transposition_table
+        engine = agent.engine
+        futures = []
+        self.stop_flag.value = 0
+        if self.executor is not None:
+            futures = [self.executor.submit(_helperSearch, engine, state,
+                                            agent.order, depth, helper,
+                                            table.generation)
+                       for helper in range(self.workers - 1)]
+        try:
+            result = agent.search(state, depth)
+        finally:
+            self.stop_flag.value = 1
+            nodes = sum(future.result() for future in futures)
+        agent.debug_counter += nodes
+        return result
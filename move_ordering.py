@@ -0,0 +1,131 @@
+## Move ordering for alpha-beta search.
+## Better moves searched first make more cutoffs, so actions are sorted by
+## hash move (best move stored in transposition table), killer moves (moves
+## which caused cutoffs at the same ply), history heuristic (moves which
+## caused cutoffs anywhere), static square priorities and mobility.
+
+
+# priorities of categories of squares (larger is searched earlier)
+CORNER = 8
+EDGE = 4
+INNER = 3
+SECOND_RING = 2   # squares next to the edges, which give the edges away
+C_SQUARE = 1      # edge squares next to corners
+X_SQUARE = 0      # squares diagonally next to corners
+
+_priority_tables = {}
+
+def getSquarePriorities(size=8):
+    """Get static priorities of squares (cached by size)."""
+    try:
+        return _priority_tables[size]
+    except KeyError:
+        pass
+    last = size - 1
+    table = []
+    for row in range(size):
+        for col in range(size):
+            on_edge_row = row in (0, last)
+            on_edge_col = col in (0, last)
+            near_row = row in (1, last-1)
+            near_col = col in (1, last-1)
+            if on_edge_row and on_edge_col:
+                table.append(CORNER)
+            elif near_row and near_col:
+                table.append(X_SQUARE)
+            elif (on_edge_row and near_col) or (on_edge_col and near_row):
+                table.append(C_SQUARE)
+            elif on_edge_row or on_edge_col:
+                table.append(EDGE)
+            elif near_row or near_col:
+                table.append(SECOND_RING)
+            else:
+                table.append(INNER)
+    _priority_tables[size] = tuple(table)
+    return _priority_tables[size]
+
+
+class MoveOrderer():
+
+    HASH_BONUS = 1 << 40
+    KILLER_BONUS = (1 << 38, 1 << 37)   # for the first and second killer
+    STATIC_WEIGHT = 1 << 12
+    MOBILITY_WEIGHT = 1 << 10
+    HISTORY_LIMIT = 1 << 30
+
+    def __init__(self, size=8, num_killers=2, use_history=True,
+                 mobility_depth=3):
+        self.size = size
+        self.num_killers = num_killers
+        self.use_history = use_history
+        # order by opponent's mobility only when depth is at least this
+        # (None to disable), since it needs to take every action
+        self.mobility_depth = mobility_depth
+        self.priorities = getSquarePriorities(size)
+        self.clear()
+
+    def clear(self):
+        self.killers = []   # killers[ply]: list of actions
+        # history[player][sq]: sum of depth^2 of cutoffs by the move
+        self.history = [[0] * (self.size*self.size) for _ in range(2)]
+
+    def newSearch(self):
+        """Forget killers and age history before a new search."""
+        self.killers = []
+        for table in self.history:
+            for sq in range(len(table)):
+                table[sq] >>= 1
+
+    def order(self, board, actions, ply, depth, hash_action=None):
+        """Sort actions of the player to move so that better ones come first."""
+        if len(actions) <= 1:
+            return actions
+        size = board.size
+        player = board.player
+        if size != self.size:
+            self.size = size
+            self.priorities = getSquarePriorities(size)
+            self.clear()
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        history = self.history[player]
+        use_mobility = self.mobility_depth is not None and \
+                       depth >= self.mobility_depth
+        scored = []
+        for action in actions:
+            sq = action[0]*size + action[1]
+            if action == hash_action:
+                score = self.HASH_BONUS
+            elif action in killers:
+                score = self.KILLER_BONUS[killers.index(action)]
+            else:
+                score = self.priorities[sq] * self.STATIC_WEIGHT
+                if self.use_history:
+                    score += history[sq]
+                if use_mobility:
+                    # fewer actions left to the opponent is better
+                    undo = board.make_move(action, player)
+                    score -= board.mobility() * self.MOBILITY_WEIGHT
+                    board.unmake_move(undo)
+            scored.append( (score, action) )
+        scored.sort(key=lambda pair: pair[0], reverse=True)
+        return [action for _, action in scored]
+
+    def recordCutoff(self, action, player, ply, depth):
+        """Remember the action which caused a beta cutoff."""
+        if type(action) != tuple:
+            return
+        if self.num_killers > 0:
+            while len(self.killers) <= ply:
+                self.killers.append([])
+            killers = self.killers[ply]
+            if action in killers:
+                killers.remove(action)
+            killers.insert(0, action)
+            del killers[self.num_killers:]
+        if self.use_history:
+            table = self.history[player]
+            sq = action[0]*self.size + action[1]
+            table[sq] += depth * depth
+            if table[sq] > self.HISTORY_LIMIT:
+                for i in range(len(table)):
+                    table[i] >>= 1
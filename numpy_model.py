@@ -0,0 +1,103 @@
+## Inference of Keras Sequential models of Dense layers with numpy only.
+## Weights and activations are read from the .h5 file saved by Keras
+## (model.save), so TensorFlow is not needed to evaluate the models.
+## h5py is imported only when a file is loaded.
+
+import json
+
+import numpy as np
+
+
+def relu(x):
+    return np.maximum(x, 0)
+
+def sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+def softmax(x):
+    e = np.exp(x - x.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+def linear(x):
+    return x
+
+ACTIVATIONS = {
+    "relu": relu,
+    "sigmoid": sigmoid,
+    "softmax": softmax,
+    "tanh": np.tanh,
+    "linear": linear,
+}
+
+# layers which do nothing at inference for inputs of shape (N, features)
+PASS_THROUGH_LAYERS = ("InputLayer", "Dropout", "Flatten")
+
+
+class NumpyModel():
+
+    def __init__(self, layers):
+        # layers: list of (kernel, bias or None, activation function)
+        self.layers = layers
+
+    @classmethod
+    def load(cls, filename):
+        """Load the model from .h5 file saved by Keras."""
+        import h5py
+        with h5py.File(filename, "r") as f:
+            config = f.attrs.get("model_config")
+            if config is None:
+                raise ValueError(f"{filename} has no model config")
+            if isinstance(config, bytes):
+                config = config.decode("utf-8")
+            config = json.loads(config)["config"]
+            if isinstance(config, dict):
+                config = config["layers"]
+            weights = f["model_weights"] if "model_weights" in f else f
+
+            layers = []
+            for layer in config:
+                class_name = layer["class_name"]
+                layer_config = layer["config"]
+                if class_name in PASS_THROUGH_LAYERS:
+                    continue
+                if class_name == "Activation":
+                    layers.append( (None, None,
+                                    cls.getActivation(layer_config["activation"])) )
+                    continue
+                if class_name != "Dense":
+                    raise ValueError(f"Unsupported layer: {class_name}")
+                group = weights[layer_config["name"]]
+                names = [n.decode("utf-8") if isinstance(n, bytes) else n
+                         for n in group.attrs["weight_names"]]
+                kernel = np.asarray(group[names[0]], dtype=np.float32)
+                bias = np.asarray(group[names[1]], dtype=np.float32) \
+                       if layer_config.get("use_bias", True) else None
+                layers.append( (kernel, bias,
+                                cls.getActivation(layer_config["activation"])) )
+        return cls(layers)
+
+    @staticmethod
+    def getActivation(name):
+        try:
+            return ACTIVATIONS[name]
+        except KeyError:
+            raise ValueError(f"Unsupported activation: {name}")
+
+    def predict_on_batch(self, x):
+        """Get outputs of the model for inputs of shape (N, features)."""
+        x = np.asarray(x, dtype=np.float32)
+        for kernel, bias, activation in self.layers:
+            if kernel is not None:
+                x = x @ kernel
+                if bias is not None:
+                    x += bias
+            x = activation(x)
+        return x
+
+    def predict(self, x, **kwargs):
+        """Same as predict_on_batch (for compatibility with Keras models)."""
+        return self.predict_on_batch(x)
+
+    def evaluateOne(self, x):
+        """Get outputs of the model for one input of shape (features,)."""
+        return self.predict_on_batch(np.reshape(x, (1, -1)))[0]
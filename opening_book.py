@@ -0,0 +1,203 @@
+## Opening book built from game records.
+## Positions are keyed by bitboards of (player to move, opponent), so the
+## book doesn't depend on the color, and canonicalized under the 8
+## symmetries of the board (the smallest of the 8 transformed keys), so
+## the transformed openings share their entries. Statistics of the moves
+## played in each position are kept, and saved in a npz file of arrays
+## (loaded into memory) or in a position database (memory-mapped).
+
+import numpy as np
+
+import bitboard
+from position_db import PositionDatabase
+
+
+# payload of records of the book in position database
+BOOK_PAYLOAD = np.dtype([("move", "u1"), ("count", "<u4"), ("wins", "<u4"),
+                         ("draws", "<u4"), ("diff_sum", "<i4")])
+
+
+class OpeningBook():
+
+    def __init__(self, size=8):
+        self.size = size
+        # entries[(player, opponent)][move]: [count, wins, draws, sum of
+        # disc differentials at the end] in sight of the player to move
+        self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def canonicalize(self, player, opponent):
+        """Get (player, opponent, symmetry) of the canonical position."""
+        best = None
+        for symmetry in range(8):
+            key = (bitboard.transform(player, symmetry, self.size),
+                   bitboard.transform(opponent, symmetry, self.size))
+            if best is None or key < best[0]:
+                best = (key, symmetry)
+        (player, opponent), symmetry = best
+        return (player, opponent, symmetry)
+
+    def add(self, player, opponent, sq, diff):
+        """Add the move on sq played in the position, and the result of the
+           game (disc differential for the player to move)."""
+        player, opponent, symmetry = self.canonicalize(player, opponent)
+        move = bitboard.transform(1 << sq, symmetry, self.size).bit_length() - 1
+        stats = self.entries.setdefault( (player, opponent), {} )
+        stat = stats.setdefault(move, [0, 0, 0, 0])
+        stat[0] += 1
+        if diff > 0:
+            stat[1] += 1
+        elif diff == 0:
+            stat[2] += 1
+        stat[3] += diff
+
+    def addRecord(self, moves, dark_diff, max_plies=20):
+        """Add the first max_plies moves of a record given as a list of
+           squares, and the disc differential of the dark player."""
+        size = self.size
+        half = size // 2
+        # initial position (same as Othello)
+        white = (1 << ((half-1)*size + half-1)) | (1 << (half*size + half))
+        black = (1 << ((half-1)*size + half)) | (1 << (half*size + half-1))
+        player, opponent = black, white
+        diff = dark_diff
+        for sq in moves[:max_plies]:
+            flips = bitboard.getFlips(player, opponent, sq, size)
+            if flips == 0:
+                # the player to move passed
+                player, opponent = opponent, player
+                diff = -diff
+                flips = bitboard.getFlips(player, opponent, sq, size)
+                if flips == 0:
+                    raise ValueError(f"invalid move in record: {sq}")
+            self.add(player, opponent, sq, diff)
+            player, opponent = opponent ^ flips, player | flips | (1 << sq)
+            diff = -diff
+
+    def prune(self, min_count):
+        """Remove moves played less than min_count times."""
+        for key in list(self.entries):
+            stats = {m: s for m, s in self.entries[key].items()
+                     if s[0] >= min_count}
+            if stats:
+                self.entries[key] = stats
+            else:
+                del self.entries[key]
+
+    def getStats(self, player, opponent):
+        """Get statistics of moves of the canonical position or None."""
+        return self.entries.get( (player, opponent) )
+
+    def lookup(self, player, opponent):
+        """Get {square: [count, wins, draws, sum of differentials]} of the
+           moves in the position (squares in the given orientation)."""
+        key_player, key_opponent, symmetry = self.canonicalize(player, opponent)
+        stats = self.getStats(key_player, key_opponent)
+        if not stats:
+            return {}
+        # find the squares of legal moves which map to the book moves
+        result = {}
+        for sq in bitboard.iterBits(bitboard.getMoves(player, opponent, self.size)):
+            move = bitboard.transform(1 << sq, symmetry, self.size).bit_length() - 1
+            if move in stats:
+                result[sq] = stats[move]
+        return result
+
+    def chooseMove(self, player, opponent, min_count=1, policy="count"):
+        """Choose the square of the move from the book, or None if the
+           position is not in the book. policy is "count" (the most played
+           move) or "score" (the best average differential)."""
+        candidates = [(sq, stat) for sq, stat in
+                      self.lookup(player, opponent).items()
+                      if stat[0] >= min_count]
+        if not candidates:
+            return None
+        if policy == "count":
+            key = lambda c: (c[1][0], c[1][3] / c[1][0], -c[0])
+        elif policy == "score":
+            key = lambda c: (c[1][3] / c[1][0], c[1][0], -c[0])
+        else:
+            raise ValueError(f"Unknown policy: {policy}")
+        return max(candidates, key=key)[0]
+
+    def save(self, filename):
+        """Save the book into npz file."""
+        if self.size * self.size > 64:
+            raise ValueError("only boards up to 64 squares can be saved")
+        players = []
+        opponents = []
+        moves = []
+        stats = []
+        for (player, opponent), entry in self.entries.items():
+            for move, stat in entry.items():
+                players.append(player)
+                opponents.append(opponent)
+                moves.append(move)
+                stats.append(stat)
+        stats = np.array(stats, dtype=np.int64).reshape(-1, 4)
+        np.savez_compressed(filename, size=self.size,
+                            players=np.array(players, dtype=np.uint64),
+                            opponents=np.array(opponents, dtype=np.uint64),
+                            moves=np.array(moves, dtype=np.uint8),
+                            counts=stats[:,0].astype(np.uint32),
+                            wins=stats[:,1].astype(np.uint32),
+                            draws=stats[:,2].astype(np.uint32),
+                            diff_sums=stats[:,3].astype(np.int32))
+
+    def saveDatabase(self, filename):
+        """Save the book into position database file (one record for each
+           move of each position)."""
+        players = []
+        opponents = []
+        payloads = []
+        for (player, opponent), entry in self.entries.items():
+            for move, stat in entry.items():
+                players.append(player)
+                opponents.append(opponent)
+                payloads.append( (move, *stat) )
+        PositionDatabase.create(filename, players, opponents,
+                                np.zeros(len(payloads), dtype=np.uint8),
+                                np.array(payloads, dtype=BOOK_PAYLOAD),
+                                self.size)
+
+    @classmethod
+    def load(cls, filename):
+        """Load the book from npz file."""
+        data = np.load(filename)
+        book = cls(int(data["size"]))
+        columns = zip(data["players"].tolist(), data["opponents"].tolist(),
+                      data["moves"].tolist(), data["counts"].tolist(),
+                      data["wins"].tolist(), data["draws"].tolist(),
+                      data["diff_sums"].tolist())
+        for player, opponent, move, count, wins, draws, diff_sum in columns:
+            stats = book.entries.setdefault( (player, opponent), {} )
+            stats[move] = [count, wins, draws, diff_sum]
+        return book
+
+
+class MappedOpeningBook(OpeningBook):
+    """Opening book which reads the entries from the position database
+       file on demand instead of loading them"""
+
+    def __init__(self, filename):
+        self.database = PositionDatabase(filename)
+        super().__init__(self.database.size)
+
+    def __len__(self):
+        # number of records (moves), not positions
+        return len(self.database)
+
+    def getStats(self, player, opponent):
+        payloads = self.database.findAll(player, opponent)
+        return {int(p["move"]): [int(p["count"]), int(p["wins"]),
+                                 int(p["draws"]), int(p["diff_sum"])]
+                for p in payloads}
+
+
+def loadOpeningBook(filename):
+    """Load the book from npz file, or open the position database file."""
+    if filename.endswith(".npz"):
+        return OpeningBook.load(filename)
+    return MappedOpeningBook(filename)
@@ -1,6 +1,8 @@
 import re
 import numpy as np
 
+import bitboard
+import zobrist
 #from base81 import *
 
 
@@ -18,15 +20,68 @@ BLANK = 1
 WHITE = 2
 BLACK = 3
 
+# Rays (sequences of flat indices going outward) from each square for each
+# board size. They never change for a given size, so they are computed once
+# and shared by all Othello instances.
+_ray_tables = {}
+
+def getRayTable(size):
+    """Get the table of rays: square -> tuple of rays (cached by size)."""
+    try:
+        return _ray_tables[size]
+    except KeyError:
+        pass
+    table = []
+    for row in range(size):
+        for col in range(size):
+            rays = []
+            for dr, dc in ((0,1), (0,-1), (1,0), (-1,0),
+                           (-1,1), (-1,-1), (1,-1), (1,1)):
+                ray = []
+                r, c = row + dr, col + dc
+                while 0 <= r < size and 0 <= c < size:
+                    ray.append(r*size + c)
+                    r, c = r + dr, c + dc
+                # a ray shorter than 2 squares can't reverse any discs
+                if len(ray) >= 2:
+                    rays.append(tuple(ray))
+            table.append(tuple(rays))
+    _ray_tables[size] = tuple(table)
+    return _ray_tables[size]
+
+def _isAvailableOnRays(board, rays, player_disc, opponent_disc):
+    """Check if any of rays (from a blank square) is closed by player_disc."""
+    for ray in rays:
+        if board[ray[0]] != opponent_disc:
+            continue
+        for idx in ray[1:]:
+            disc = board[idx]
+            if disc == player_disc:
+                return True
+            elif disc != opponent_disc:
+                break
+    return False
+
+
 # Environment
 class Othello():
 
-    def __init__(self, sz, player1=None, player2=None):
+    def __init__(self, sz, player1=None, player2=None, backend="numpy"):
         # use szxsz matrix with the value range [1,2,3] to represent states
         self.size = sz
-        self.state = np.full((sz, sz), BLANK, dtype=np.int16)
+        # engine which implements the static game functions (smActions...)
+        if backend == "numpy":
+            self.engine = Othello
+        elif backend == "bitboard":
+            self.engine = BitboardOthello
+        else:
+            raise ValueError(f"Unknown backend: {backend}")
+        self.state = np.full((sz, sz), BLANK, dtype=np.int8)
         self.state[sz//2-1,sz//2-1] = WHITE; self.state[sz//2-1,sz//2] = BLACK
         self.state[sz//2,sz//2-1] = BLACK; self.state[sz//2,sz//2] = WHITE
+        # zobrist key of the state and the player to move,
+        # which is updated by takeAction and takeActionVerbose
+        self.key = zobristHash(self.state, DARK_PLAYER)
         self.player1 = player1
         self.player2 = player2
         if player1 is not None:
@@ -57,22 +112,7 @@ class Othello():
         """Get available actions"""
         if state is None:
             state = self.state
-        if player == DARK_PLAYER:  # black
-            player_disc = BLACK
-            opponent_disc = WHITE
-        else:                      # white
-            player_disc = WHITE
-            opponent_disc = BLACK
-        acts = []
-        for row in range(self.size):
-            for col in range(self.size):
-                if self.isAvailablePosition(state, row, col,
-                                       player_disc, opponent_disc):
-                    acts.append( (row,col) )
-        # if no available actions, pass
-        if len(acts) == 0:
-            acts.append("pass")
-        return acts
+        return self.engine.smActions(player, state)
 
     def actionsVerbose(self, player, state=None):
         """Get available actions in verbose format
@@ -103,6 +143,8 @@ class Othello():
 
         # pass
         if type(action) != tuple:
+            self.key = getZobristTable(self.size).updateKey(
+                self.key, which_player, None, ())
             return
 
         if which_player == DARK_PLAYER:  # first mover uses black discs
@@ -118,6 +160,8 @@ class Othello():
         if len(tobeReversed) > 1:  # if this is a valid action
             for coord in tobeReversed:
                 self.state[coord] = player_disc
+            self.key = zobristUpdate(self.key, which_player,
+                                     tobeReversed, self.size)
 
         else:
             raise ActionError("invalid action!")
@@ -129,6 +173,8 @@ class Othello():
 
         # pass
         if action_verbose == ("pass","pass"):
+            self.key = getZobristTable(self.size).updateKey(
+                self.key, which_player, None, ())
             return
 
         if which_player == DARK_PLAYER:  # first mover uses black discs
@@ -138,18 +184,14 @@ class Othello():
 
         for coord in action_verbose:
             self.state[coord] = player_disc
+        self.key = zobristUpdate(self.key, which_player,
+                                 action_verbose, self.size)
 
     def terminal(self, state=None):
         """Check if the game is over."""
         if state is None:
             state = self.state
-        for row in range(self.size):
-            for col in range(self.size):
-                if self.isAvailablePosition(state, row, col, BLACK, WHITE):
-                    return False
-                if self.isAvailablePosition(state, row, col, WHITE, BLACK):
-                    return False
-        return True
+        return self.engine.smTerminal(state)
 
     def utility(self, state=None):
         """Get utility (indicates which player won) of the state."""
@@ -164,6 +206,8 @@ class Othello():
     def score(self, state=None):
         if state is None:
             state = self.state
+        if self.engine is not Othello:
+            return self.engine.smScore(state)
         num_black = 0
         num_white = 0
         for row in range(self.size):
@@ -192,6 +236,7 @@ class Othello():
                     try:
                         action = self.player1.chooseAction()
                         if action == "pass":            # pass
+                            self.takeAction(action, DARK_PLAYER)
                             print(self.player1, " passed turn")
                         elif type(action[0]) == int:      # simple format
                             self.takeAction(action, DARK_PLAYER)
@@ -211,6 +256,7 @@ class Othello():
                     try:
                         action = self.player2.chooseAction()
                         if action == "pass":            # pass
+                            self.takeAction(action, LIGHT_PLAYER)
                             print(self.player2, " passed turn")
                         elif type(action[0]) == int:      # simple format
                             self.takeAction(action, LIGHT_PLAYER)
@@ -269,16 +315,10 @@ class Othello():
         while True:
             if turn_counter == DARK_PLAYER:
                 action = self.player1.chooseAction()
-                if action == "pass":
-                    pass
-                else:
-                    self.takeAction(action, 0)
+                self.takeAction(action, 0)
             else:
                 action = self.player2.chooseAction()
-                if action == "pass":
-                    pass
-                else:
-                    self.takeAction(action, 1)
+                self.takeAction(action, 1)
             # check if the game is over and notify players of the result
             if self.terminal():
                 util = self.utility()
@@ -316,49 +356,9 @@ class Othello():
            state[row,col] != BLANK:
             return False
 
-        size = state.shape[0]
-        m = size - 3
-        directions = set()
-        if col <= m and state[row,col+1] == opponent_disc:  # right
-            directions.add( (0,1) )
-        if col >= 2 and state[row,col-1] == opponent_disc:  # left
-            directions.add( (0,-1) )
-        if row <= m and state[row+1,col] == opponent_disc:  # bottom
-            directions.add( (1,0) )
-        if row >= 2 and state[row-1,col] == opponent_disc:  # top
-            directions.add( (-1,0) )
-        if row >= 2 and col <= m and state[row-1,col+1] == opponent_disc: # rt
-            directions.add( (-1,1) )
-        if row >= 2 and col >= 2 and state[row-1,col-1] == opponent_disc: # lt
-            directions.add( (-1,-1) )
-        if row <= m and col >= 2 and state[row+1,col-1] == opponent_disc: # lb
-            directions.add( (1,-1) )
-        if row <= m and col <= m and state[row+1,col+1] == opponent_disc: # rb
-            directions.add( (1,1) )
-
-        i = 2
-        while True:
-            if len(directions) == 0:
-                return False
-
-            remove_directions = set()
-            for d in directions:
-                next_row, next_col = row + i*d[0], col + i*d[1]
-                if next_row < 0 or size-1 < next_row or \
-                   next_col < 0 or size-1 < next_col:
-                    # not valid for this direction
-                    remove_directions.add(d)
-                elif state[next_row, next_col] == player_disc:
-                    # this action is valid
-                    return True
-                elif state[next_row, next_col] == opponent_disc:
-                    # maybe valid
-                    continue
-                elif state[next_row, next_col] == BLANK:
-                    # not valid for this direction
-                    remove_directions.add(d)
-            directions.difference_update(remove_directions)
-            i += 1
+        return _isAvailableOnRays(state.reshape(-1),
+                                  getRayTable(size)[row*size + col],
+                                  player_disc, opponent_disc)
 
     @staticmethod
     def getDiscsToBeReversed(state, row, col, player_disc, opponent_disc):
@@ -369,46 +369,18 @@ class Othello():
            state[row,col] != BLANK:
             return ()
 
-        m = size - 3
-        directions = set()
-        if col <= m and state[row,col+1] == opponent_disc:  # right
-            directions.add( (0,1) )
-        if col >= 2 and state[row,col-1] == opponent_disc:  # left
-            directions.add( (0,-1) )
-        if row <= m and state[row+1,col] == opponent_disc:  # bottom
-            directions.add( (1,0) )
-        if row >= 2 and state[row-1,col] == opponent_disc:  # top
-            directions.add( (-1,0) )
-        if row >= 2 and col <= m and state[row-1,col+1] == opponent_disc: # rt
-            directions.add( (-1,1) )
-        if row >= 2 and col >= 2 and state[row-1,col-1] == opponent_disc: # lt
-            directions.add( (-1,-1) )
-        if row <= m and col >= 2 and state[row+1,col-1] == opponent_disc: # lb
-            directions.add( (1,-1) )
-        if row <= m and col <= m and state[row+1,col+1] == opponent_disc: # rb
-            directions.add( (1,1) )
-        if len(directions) == 0:  # no candidates
-            return ()
-
+        board = state.reshape(-1)
         tobeReversed = []
-        for d in directions:
-            i = 2
-            tobeReversedInDirection = [(row+d[0],col+d[1])]
-            while True:
-                next_row, next_col = row + i*d[0], col + i*d[1]
-                i += 1
-                if next_row < 0 or size-1 < next_row or \
-                   next_col < 0 or size-1 < next_col:
-                    # not a valid action
-                    break
-                elif state[next_row, next_col] == player_disc:
+        for ray in getRayTable(size)[row*size + col]:
+            if board[ray[0]] != opponent_disc:
+                continue
+            for i, idx in enumerate(ray):
+                disc = board[idx]
+                if disc == player_disc:
                     # now, you get (row,col) is a valid action
-                    tobeReversed.extend(tobeReversedInDirection)
+                    tobeReversed.extend(divmod(j, size) for j in ray[:i])
                     break
-                elif state[next_row, next_col] == opponent_disc:
-                    # maybe a valid action
-                    tobeReversedInDirection.append( (next_row, next_col) )
-                elif state[next_row, next_col] == BLANK:
+                elif disc != opponent_disc:
                     # not a valid action
                     break
         if len(tobeReversed) > 0:  # if valid action, insert (row,col)
@@ -426,25 +398,30 @@ class Othello():
             opponent_disc = BLACK
         acts = []
         size = state.shape[0]
-        for row in range(size):
-            for col in range(size):
-                if Othello.isAvailablePosition(state, row, col,
-                                               player_disc, opponent_disc):
-                    acts.append( (row,col) )
+        board = state.reshape(-1).tolist()
+        rays = getRayTable(size)
+        for sq in range(size*size):
+            if board[sq] == BLANK and \
+               _isAvailableOnRays(board, rays[sq], player_disc, opponent_disc):
+                acts.append(divmod(sq, size))
         # if no available actions, pass
         if len(acts) == 0:
             acts.append("pass")
         return acts
 
     @staticmethod
-    def smResult(state, action, which_player):
-        """Get next state of state by taking action."""
+    def smResult(state, action, which_player, key=None):
+        """Get next state of state by taking action.
+           If zobrist key of state is given, return (next state, next key)."""
         # action is represented by tuple (row,col)
 
         new_state = state.copy()
 
         # pass
         if type(action) != tuple:
+            if key is not None:
+                return (new_state, getZobristTable(state.shape[0]).updateKey(
+                    key, which_player, None, ()))
             return new_state
         
         if which_player == DARK_PLAYER:  # first mover uses black discs
@@ -460,6 +437,9 @@ class Othello():
         if len(tobeReversed) > 1:  # if this is a valid action
             for coord in tobeReversed:
                 new_state[coord] = player_disc
+            if key is not None:
+                return (new_state, zobristUpdate(key, which_player,
+                                                 tobeReversed, state.shape[0]))
             return new_state
         else:
             raise ActionError("invalid action!")
@@ -467,12 +447,13 @@ class Othello():
     @staticmethod
     def smTerminal(state):
         size = state.shape[0]
-        for row in range(size):
-            for col in range(size):
-                if Othello.isAvailablePosition(state, row, col, BLACK, WHITE):
-                    return False
-                if Othello.isAvailablePosition(state, row, col, WHITE, BLACK):
-                    return False
+        board = state.reshape(-1).tolist()
+        rays = getRayTable(size)
+        for sq in range(size*size):
+            if board[sq] == BLANK and \
+               (_isAvailableOnRays(board, rays[sq], BLACK, WHITE) or
+                _isAvailableOnRays(board, rays[sq], WHITE, BLACK)):
+                return False
         return True
 
     @staticmethod
@@ -499,6 +480,298 @@ class Othello():
                     num_white += 1
         return (num_black, num_white)
 
+    @staticmethod
+    def smSearchBoard(state, player=DARK_PLAYER):
+        """Get a mutable board for searching from state."""
+        return SearchBoard(state, player)
+
+
+# Same static interface as Othello, but each function converts the state to
+# a pair of bitboards and uses shift-and-mask operations of bitboard module
+class BitboardOthello():
+
+    @staticmethod
+    def toBitboards(state):
+        """Convert state to bitboards (black, white)."""
+        flat = state.reshape(-1)
+        black = int.from_bytes(
+            np.packbits(flat == BLACK, bitorder="little").tobytes(), "little")
+        white = int.from_bytes(
+            np.packbits(flat == WHITE, bitorder="little").tobytes(), "little")
+        return (black, white)
+
+    @staticmethod
+    def fromBitboards(black, white, size=8):
+        """Convert bitboards (black, white) to state."""
+        num_bytes = (size*size + 7) // 8
+        def unpack(x):
+            bits = np.unpackbits(
+                np.frombuffer(x.to_bytes(num_bytes, "little"), dtype=np.uint8),
+                bitorder="little")
+            return bits[:size*size].astype(np.int8)
+        state = BLANK + (BLACK-BLANK)*unpack(black) + (WHITE-BLANK)*unpack(white)
+        return state.reshape((size, size))
+
+    @staticmethod
+    def smActions(player, state):
+        """Get available actions."""
+        size = state.shape[0]
+        black, white = BitboardOthello.toBitboards(state)
+        if player == DARK_PLAYER:
+            moves = bitboard.getMoves(black, white, size)
+        else:
+            moves = bitboard.getMoves(white, black, size)
+        acts = [divmod(sq, size) for sq in bitboard.iterBits(moves)]
+        # if no available actions, pass
+        if len(acts) == 0:
+            acts.append("pass")
+        return acts
+
+    @staticmethod
+    def smResult(state, action, which_player, key=None):
+        """Get next state of state by taking action.
+           If zobrist key of state is given, return (next state, next key)."""
+        # pass
+        if type(action) != tuple:
+            if key is not None:
+                return (state.copy(), getZobristTable(state.shape[0]).updateKey(
+                    key, which_player, None, ()))
+            return state.copy()
+
+        size = state.shape[0]
+        black, white = BitboardOthello.toBitboards(state)
+        sq = action[0]*size + action[1]
+        if which_player == DARK_PLAYER:
+            flips = bitboard.getFlips(black, white, sq, size)
+        else:
+            flips = bitboard.getFlips(white, black, sq, size)
+        if flips == 0:
+            raise ActionError("invalid action!")
+        # only rewrite the changed squares of the copied state
+        new_state = state.copy()
+        new_state.reshape(-1)[list(bitboard.iterBits(flips | (1 << sq)))] = \
+            BLACK if which_player == DARK_PLAYER else WHITE
+        if key is not None:
+            return (new_state, getZobristTable(size).updateKey(
+                key, which_player, sq, bitboard.iterBits(flips)))
+        return new_state
+
+    @staticmethod
+    def smTerminal(state):
+        size = state.shape[0]
+        black, white = BitboardOthello.toBitboards(state)
+        return bitboard.getMoves(black, white, size) == 0 and \
+               bitboard.getMoves(white, black, size) == 0
+
+    @staticmethod
+    def smUtility(state):
+        """Get utility (indicates which player won) of the state."""
+        score = BitboardOthello.smScore(state)
+        if score[0] > score[1]:   # dark player won
+            return 1
+        elif score[0] < score[1]: # light player won
+            return -1
+        else:                     # draw
+            return 0
+
+    @staticmethod
+    def smScore(state):
+        black, white = BitboardOthello.toBitboards(state)
+        return (bitboard.popcount(black), bitboard.popcount(white))
+
+    @staticmethod
+    def smSearchBoard(state, player=DARK_PLAYER):
+        """Get a mutable board for searching from state."""
+        return BitboardSearchBoard(state, player)
+
+
+# Mutable board used by search algorithms.
+# make_move() changes the board in place and returns an undo record,
+# and unmake_move() restores the board from the record,
+# so that searching needs no copy of the state per node.
+class SearchBoard():
+
+    def __init__(self, state, player=DARK_PLAYER):
+        self.size = state.shape[0]
+        self.state = state.copy()
+        self.player = player   # player to move
+        self.key = zobristHash(self.state, player)
+
+    def copy(self):
+        return SearchBoard(self.state, self.player)
+
+    def getState(self):
+        """Get the current state (do not modify it, it is shared)"""
+        return self.state
+
+    def actions(self, player=None):
+        """Get available actions."""
+        if player is None:
+            player = self.player
+        return Othello.smActions(player, self.state)
+
+    def mobility(self, player=None):
+        """Get the number of available actions (except pass)."""
+        acts = self.actions(player)
+        return 0 if acts[0] == "pass" else len(acts)
+
+    def make_move(self, move, player=None):
+        """Take the move and return the record to undo it."""
+        if player is None:
+            player = self.player
+        self.player = 1 - player
+        key = self.key
+        # pass
+        if type(move) != tuple:
+            self.key = getZobristTable(self.size).updateKey(key, player,
+                                                            None, ())
+            return (player, (), key)
+
+        if player == DARK_PLAYER:
+            player_disc = BLACK
+            opponent_disc = WHITE
+        else:
+            player_disc = WHITE
+            opponent_disc = BLACK
+        tobeReversed = Othello.getDiscsToBeReversed(self.state,
+                                                    move[0], move[1],
+                                                    player_disc, opponent_disc)
+        if len(tobeReversed) <= 1:
+            self.player = player
+            raise ActionError("invalid action!")
+        for coord in tobeReversed:
+            self.state[coord] = player_disc
+        self.key = zobristUpdate(key, player, tobeReversed, self.size)
+        return (player, tobeReversed, key)
+
+    def unmake_move(self, undo):
+        """Restore the board from the undo record."""
+        player, tobeReversed, self.key = undo
+        self.player = player
+        if len(tobeReversed) == 0:
+            return
+        opponent_disc = WHITE if player == DARK_PLAYER else BLACK
+        self.state[tobeReversed[0]] = BLANK
+        for coord in tobeReversed[1:]:
+            self.state[coord] = opponent_disc
+
+    def terminal(self):
+        return Othello.smTerminal(self.state)
+
+    def score(self):
+        return Othello.smScore(self.state)
+
+    def utility(self):
+        return Othello.smUtility(self.state)
+
+
+# Search board which keeps bitboards of both colors
+class BitboardSearchBoard():
+
+    def __init__(self, state=None, player=DARK_PLAYER, size=8):
+        if state is not None:
+            size = state.shape[0]
+            self.black, self.white = BitboardOthello.toBitboards(state)
+        else:
+            self.black, self.white = 0, 0
+        self.size = size
+        self.player = player   # player to move
+        self.zobrist = getZobristTable(size)
+        self.key = self.zobrist.hashBitboards(self.black, self.white, player)
+
+    @staticmethod
+    def fromBitboards(black, white, player=DARK_PLAYER, size=8):
+        board = BitboardSearchBoard(None, player, size)
+        board.black = black
+        board.white = white
+        board.key = board.zobrist.hashBitboards(black, white, player)
+        return board
+
+    def copy(self):
+        return BitboardSearchBoard.fromBitboards(self.black, self.white,
+                                                 self.player, self.size)
+
+    def getState(self):
+        return BitboardOthello.fromBitboards(self.black, self.white, self.size)
+
+    def moves(self, player=None):
+        """Get the bitmask of available moves."""
+        if player is None:
+            player = self.player
+        if player == DARK_PLAYER:
+            return bitboard.getMoves(self.black, self.white, self.size)
+        else:
+            return bitboard.getMoves(self.white, self.black, self.size)
+
+    def actions(self, player=None):
+        """Get available actions."""
+        acts = [divmod(sq, self.size)
+                for sq in bitboard.iterBits(self.moves(player))]
+        # if no available actions, pass
+        if len(acts) == 0:
+            acts.append("pass")
+        return acts
+
+    def mobility(self, player=None):
+        """Get the number of available actions (except pass)."""
+        return bitboard.popcount(self.moves(player))
+
+    def make_move(self, move, player=None):
+        """Take the move and return the record to undo it."""
+        if player is None:
+            player = self.player
+        self.player = 1 - player
+        key = self.key
+        # pass
+        if type(move) != tuple:
+            self.key = key ^ self.zobrist.side
+            return (player, 0, 0, key)
+
+        sq = move[0]*self.size + move[1]
+        if player == DARK_PLAYER:
+            flips = bitboard.getFlips(self.black, self.white, sq, self.size)
+        else:
+            flips = bitboard.getFlips(self.white, self.black, sq, self.size)
+        if flips == 0:
+            self.player = player
+            raise ActionError("invalid action!")
+        placed = 1 << sq
+        if player == DARK_PLAYER:
+            self.black ^= flips | placed
+            self.white ^= flips
+        else:
+            self.white ^= flips | placed
+            self.black ^= flips
+        self.key = self.zobrist.updateKey(key, player, sq,
+                                          bitboard.iterBits(flips))
+        return (player, placed, flips, key)
+
+    def unmake_move(self, undo):
+        """Restore the board from the undo record."""
+        player, placed, flips, self.key = undo
+        self.player = player
+        if player == DARK_PLAYER:
+            self.black ^= flips | placed
+            self.white ^= flips
+        else:
+            self.white ^= flips | placed
+            self.black ^= flips
+
+    def terminal(self):
+        return self.moves(DARK_PLAYER) == 0 and self.moves(LIGHT_PLAYER) == 0
+
+    def score(self):
+        return (bitboard.popcount(self.black), bitboard.popcount(self.white))
+
+    def utility(self):
+        score = self.score()
+        if score[0] > score[1]:   # dark player won
+            return 1
+        elif score[0] < score[1]: # light player won
+            return -1
+        else:                     # draw
+            return 0
+
 
 # base class of othello player
 class OthelloPlayer():
@@ -596,6 +869,27 @@ def hashState(state):
     return result[::-1]
     
 
+def getZobristTable(size=8):
+    """Get the table of random numbers for zobrist hashing."""
+    return zobrist.getZobristTable(size)
+
+
+def zobristHash(state, player=DARK_PLAYER):
+    """Calculate zobrist key of the state and the player to move."""
+    black, white = BitboardOthello.toBitboards(state)
+    return getZobristTable(state.shape[0]).hashBitboards(black, white, player)
+
+
+def zobristUpdate(key, which_player, tobeReversed, size=8):
+    """Update zobrist key after which_player took an action.
+       tobeReversed is given by getDiscsToBeReversed (the first coordinate
+       is the square where the disc is put)."""
+    row, col = tobeReversed[0]
+    return getZobristTable(size).updateKey(
+        key, which_player, row*size + col,
+        [r*size + c for r, c in tobeReversed[1:]])
+
+
 def hashStateAction(state, action):
     """hash pair of state and action."""
     h_s = hashState(state)
@@ -616,7 +910,7 @@ def retrieveState(hash_str, shape):
         decimal = decimal // 3
         flatten.append(decimal%3)
     flatten = flatten[:shape[0]*shape[1]]
-    return np.array(flatten, dtype=np.int16).reshape(shape) + 1
+    return np.array(flatten, dtype=np.int8).reshape(shape) + 1
 
 
 def isRotationalSymmetry(state, theta):
@@ -1067,15 +1361,26 @@ def transformAction(action, transformations, state_size):
     return tuple(a)
 
 
-def _normalizeDisc(disc):
-    if disc == BLANK:
-        return 0
-    elif disc == WHITE:
-        return -1
-    else:      # black
-        return 1
+# normalized value of each disc identifier: BLANK -> 0, WHITE -> -1,
+# BLACK -> 1 (index 0 is not a disc)
+_normalized_discs = np.array([0, 0, -1, 1], dtype=np.int8)
+
+def normalizeDisc(state):
+    """Normalize discs of the state (or any array of discs) to int8 array
+       of 0 (blank), -1 (white) or 1 (black) by table lookup."""
+    return _normalized_discs[state]
+
+def toZeroBasedMoves(record):
+    """Convert moves of record to 0-based "row-col" if they are 1-based
+       (the first move is not available in 0-based coordinates).
+       The csv files in othello_data are 1-based, where "0-0" means
+       the end of the game."""
+    first = tuple(map(int, record[0].split("-")))
+    if first in Othello.smActions(DARK_PLAYER, Othello(8).getState()):
+        return record
+    return ["---" if m in ("---", "0-0") else
+            "-".join(str(int(n)-1) for n in m.split("-")) for m in record]
 
-normalizeDisc = np.vectorize(_normalizeDisc, otypes=[np.int16])
 
 def getAllStatesFromRecord(record, normalize_state=False, normalize_disc=False, flatten=False):
     """simulate game and get all states from record"""
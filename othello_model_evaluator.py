@@ -7,6 +7,7 @@ import csv
 import tensorflow as tf
 
 from othello import *
+from position_dataset import openDataset
 
 
 
@@ -97,21 +98,14 @@ model.compile(
     metrics=["accuracy"]
 )
 
-x_test = []
-y_test = []
-# all states extracted by the records will be too large,
-# so separate data into some groups and evaluate the model
-for i in range(num_matches//500 + 1):
-    print(f"evaluating with {i}th group")
-    for j in range(500*i, min(num_matches, 500*(i+1))):
-        states = getAllStatesFromRecord(data[j]["record"], True, True, True)
-        label = data[j]["label"]
-        x_test.extend(states)
-        y_test.extend([ (label, 1-label) for k in range(len(states)) ])
-    result = model.evaluate(np.array(x_test), y_test, verbose=2)
+# positions (transformed by normalizeState) are replayed once and cached
+dataset = openDataset(csvfilename, normalize_state=True)
+for i, (states, info) in enumerate(dataset.iterShards()):
+    print(f"evaluating with {i}th shard")
+    labels = (info["theoretical_score"] > 32).astype(np.int32)  # 1 if dark side won
+    y_test = np.stack([labels, 1-labels], axis=1)
+    result = model.evaluate(np.asarray(states), y_test, verbose=2)
     print(f"{i}th result: ", result)
-    x_test.clear()
-    y_test.clear()
 
 
 ## pick one match and evaluate model by this match
@@ -6,6 +6,7 @@ import argparse
 import tensorflow as tf
 
 from othello import *
+from position_dataset import openDataset, makeTfDataset, DEFAULT_CACHE_DIR
 
 
 
@@ -16,13 +17,26 @@ def searchMove(data):
            return data[i:i+60]
     return None
 
+def getWthLabels(info, depth):
+    """Get (labels, late) of positions of WTH records. labels is 1 if dark
+       player won (or would win by perfect moves from depth), and late is
+       True for the positions learned more (from depth, or all positions if
+       the game was over before depth)."""
+    length = info["length"].astype(np.int32)
+    dark_won = info["dark_score"] > info["light_score"]
+    theo_won = info["theoretical_score"] > 32
+    # use real score if the game was over before depth
+    labels = np.where(length <= 60 - depth, dark_won, theo_won).astype(np.int32)
+    late = (length < 60 - depth) | (info["ply"] >= 60 - depth)
+    return (labels, late)
+
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(
         description="Train neural network model by records"
     )
     parser.add_argument("-s", "--data-source", required=True,
-                        help="csv file of records used for training")
+                        help="csv (or wtb) file of records used for training")
     parser.add_argument("-m", "--model-file", required=True,
                         help="model file to train")
     parser.add_argument("-o", "--out-file",
@@ -34,6 +48,12 @@ if __name__ == '__main__':
                         help="depth of theoretical score")
     parser.add_argument("--use-wth-format", action="store_true",
                         help="use WTH csv file, which includes some additional data")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="directory of cached positions of WTH records")
+    parser.add_argument("--batch-size", type=int, default=32,
+                        help="batch size of training with WTH records")
+    parser.add_argument("--shuffle-buffer", type=int, default=1<<16,
+                        help="number of positions shuffled at once")
     args = parser.parse_args()
 
     csvfilename = None
@@ -77,42 +97,21 @@ if __name__ == '__main__':
     ##    )
 
 
-    # read all data in from csv file
-    print(f"read all data in from csv file: {csvfilename}")
-    with open(csvfilename) as f:
-        reader = csv.reader(f)
-        
-        data = []
-        if args.use_wth_format:
-            filedata = next(reader)
-            depth = int(filedata[7].split(':')[1])
-            print("depth of theorical score: ", depth)
-            next(reader)
+    # positions of WTH records are replayed once and cached
+    use_dataset = args.use_wth_format or csvfilename.endswith(".wtb")
+    if use_dataset:
+        print(f"open dataset of records: {csvfilename}")
+        dataset = openDataset(csvfilename, args.cache_dir)
+        depth = dataset.manifests[0]["depth"]
+        print("depth of theorical score: ", depth)
 
-            for row in reader:
-                try:
-                    end_index = row.index("---")
-                except ValueError:
-                    end_index = 60
-                dark_score = int(row[5])
-                light_score = int(row[6])
-                theo_score = int(row[4])
-                num_disc = end_index + 4
-                if num_disc <= 64 - depth:
-                    # use real score
-                    data.append({
-                        "moves": row[7:],
-                        # 1 if dark player won, else 0
-                        "label": 1 if dark_score > light_score else 0
-                    })
-                else:
-                    # use theorical score
-                    data.append({
-                        "moves": row[7:],
-                        # 1 if dark player would win, else 0
-                        "label": 1 if theo_score > 32 else 0
-                    })
-        else:
+    else:
+        # read all data in from csv file
+        print(f"read all data in from csv file: {csvfilename}")
+        with open(csvfilename) as f:
+            reader = csv.reader(f)
+            
+            data = []
             depth = args.depth
             dscore = 4
             lscore = 5
@@ -170,48 +169,63 @@ if __name__ == '__main__':
                         "moves": moves,
                         "label": 1 if dark_score > light_score else 0
                     })
-        num_matches = len(data)
+            num_matches = len(data)
 
 
     # train neural network
     print("train neural network")
 
-    x_train_early = []
-    y_train_early = []
-    x_train_late = []
-    y_train_late = []
-    # all states extracted by the records will be too large,
-    # so separate data into some groups and train the model
-    batch_size = 1000
-    for i in range(num_matches//batch_size + 1):
-        print(f"training with {i}th group")
-        for j in range(batch_size*i, min(num_matches, batch_size*(i+1))):
-            states = getAllStatesFromRecord(data[j]["moves"], False, True, True)
-            num_blank = states[-1].tolist().count(0)
-            label = data[j]["label"]
-            
-            if -depth + num_blank > 0:
-                # the game was over before depth
-                print("the game was over before depth")
-                x_train_late.extend(states)
-                for _ in range(len(states)):
-                    y_train_late.append( (label, 1-label) )
-            else:
-                # otherwise, separate training data
-                x_train_early.extend(states[:60-depth])
-                for _ in range(60-depth):
-                    y_train_early.append( (label, 1-label) )
-                x_train_late.extend(states[60-depth:])
-                for _ in range(depth-num_blank):
-                    y_train_late.append( (label, 1-label) )
+    if use_dataset:
+        # positions are streamed from the shards while the model trains
+        def selectPart(is_late):
+            def select(info):
+                labels, late = getWthLabels(info, depth)
+                return (late == is_late, np.stack([labels, 1-labels], axis=1))
+            return select
         # Since early part is less informative, we make the model
         # learn much from the late part
-        model.fit(np.array(x_train_early), np.array(y_train_early), epochs=10)
-        model.fit(np.array(x_train_late), np.array(y_train_late), epochs=20)
-        x_train_early.clear()
-        y_train_early.clear()
-        x_train_late.clear()
-        y_train_late.clear()
+        for is_late, epochs in ((False, 10), (True, 20)):
+            if dataset.count(selectPart(is_late)) > 0:
+                model.fit(makeTfDataset(dataset, selectPart(is_late),
+                                        args.batch_size, args.shuffle_buffer),
+                          epochs=epochs)
+    else:
+        x_train_early = []
+        y_train_early = []
+        x_train_late = []
+        y_train_late = []
+        # all states extracted by the records will be too large,
+        # so separate data into some groups and train the model
+        batch_size = 1000
+        for i in range(num_matches//batch_size + 1):
+            print(f"training with {i}th group")
+            for j in range(batch_size*i, min(num_matches, batch_size*(i+1))):
+                states = getAllStatesFromRecord(data[j]["moves"], False, True, True)
+                num_blank = states[-1].tolist().count(0)
+                label = data[j]["label"]
+            
+                if -depth + num_blank > 0:
+                    # the game was over before depth
+                    print("the game was over before depth")
+                    x_train_late.extend(states)
+                    for _ in range(len(states)):
+                        y_train_late.append( (label, 1-label) )
+                else:
+                    # otherwise, separate training data
+                    x_train_early.extend(states[:60-depth])
+                    for _ in range(60-depth):
+                        y_train_early.append( (label, 1-label) )
+                    x_train_late.extend(states[60-depth:])
+                    for _ in range(depth-num_blank):
+                        y_train_late.append( (label, 1-label) )
+            # Since early part is less informative, we make the model
+            # learn much from the late part
+            model.fit(np.array(x_train_early), np.array(y_train_early), epochs=10)
+            model.fit(np.array(x_train_late), np.array(y_train_late), epochs=20)
+            x_train_early.clear()
+            y_train_early.clear()
+            x_train_late.clear()
+            y_train_late.clear()
 
 
     ## save model
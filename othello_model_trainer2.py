@@ -1,37 +1,44 @@
-import csv
 import argparse
 
 import tensorflow as tf
 
 from othello import *
-
-
-
-def createData(data, moves, labels, epochs):
-    # exclude the terminal state
-    all_states = getAllStatesFromRecord(moves, False, True, True)[:-1]
-    length = len(all_states)
-    for i in range(length):
-        data.append( (all_states[i], labels[i], epochs[i]) )
-
-def createDataByPlayer(dark_data, light_data, moves, labels, epochs):
-    dark_states = []
-    light_states = []
-    all_states = getAllStatesFromRecord(moves, False, True, True)
-    length = len(all_states)
-    next_mover = DARK_PLAYER
-    for i in range(length-1):
-        actual_mover = getPlayerFromStateChange(all_states[i], all_states[i+1], True)
-        if next_mover == actual_mover == DARK_PLAYER:
-            dark_data.append( (all_states[i], labels[i], epochs[i]) )
-            next_mover = LIGHT_PLAYER
-        elif next_mover == actual_mover == LIGHT_PLAYER:
-            light_data.append( (all_states[i], labels[i], epochs[i]) )
-            next_mover = DARK_PLAYER
-        else:
-            # either of players passed the turn
-            dark_data.append( (all_states[i], labels[i], epochs[i]) )
-            light_data.append( (all_states[i], labels[i], epochs[i]) )
+from position_dataset import openDataset, makeTfDataset, DEFAULT_CACHE_DIR
+
+
+
+def getTrainingData(info, use_theoscore=False):
+    """Get (labels, epochs) of positions. labels is (N, 2) array of
+       (dark player's score, 1 - score), where the score is the label given
+       for the position (if use_theoscore) or the result of the game."""
+    match_score = np.where(info["dark_score"] > info["light_score"], 1.0,
+                  np.where(info["dark_score"] < info["light_score"], 0.0, 0.5))
+    epochs = np.full(len(info), 10)
+    if use_theoscore:
+        given = ~np.isnan(info["target"])
+        match_score = np.where(given, info["target"], match_score)
+        epochs[given] = 20
+    return (np.stack([match_score, 1-match_score], axis=1), epochs)
+
+def getPlayerMask(info, player=None):
+    """Get mask of positions where the player is to move (the positions
+       before a pass belong to both players). The terminal states are
+       excluded."""
+    not_terminal = info["side"] >= 0
+    if player is None:
+        return not_terminal
+    return not_terminal & ((info["side"] == player) | info["passed"])
+
+def trainModel(model, dataset, player=None, use_theoscore=False,
+               batch_size=32, shuffle_buffer=1<<16):
+    """Train the model with positions streamed from the dataset."""
+    for e in (10, 20):
+        def select(info):
+            labels, epochs = getTrainingData(info, use_theoscore)
+            return (getPlayerMask(info, player) & (epochs == e), labels)
+        if dataset.count(select) > 0:
+            model.fit(makeTfDataset(dataset, select, batch_size,
+                                    shuffle_buffer), epochs=e)
 
 
 if __name__ == '__main__':
@@ -46,13 +53,19 @@ if __name__ == '__main__':
                         help="output model files")
     
     parser.add_argument("--header-line", type=int, default=1,
-                        help="line of header")
+                        help="line of header (detected automatically)")
     parser.add_argument("--use-theoscore", action="store_true",
                         help="use file with theoretical scores")
     parser.add_argument("--separate-dark-and-light", action="store_true",
                         help="train models for dark and light player respectively")
     parser.add_argument("--order-included-model", action="store_true",
                         help="train a model whose input includes order of action")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="directory of cached positions of records")
+    parser.add_argument("--batch-size", type=int, default=32,
+                        help="batch size of training")
+    parser.add_argument("--shuffle-buffer", type=int, default=1<<16,
+                        help="number of positions shuffled at once")
     args = parser.parse_args()
 
     csvfilename = None
@@ -97,115 +110,24 @@ if __name__ == '__main__':
         model = tf.keras.models.load_model(inh5filename)
 
 
-    # read all data in from csv file
-    print(f"read all data in from csv file: {csvfilename}")
-    with open(csvfilename) as f:
-        
-        if args.separate_dark_and_light:
-            dark_data = []
-            light_data = []
-        else:
-            data = []
-            
-        if args.header_line != 1:
-            for _ in range(args.header_line-1):
-                f.readline()
-        reader = csv.DictReader(f)
-        
-        for row in reader:
-            dark_score = int(row["dark_score"])
-            light_score = int(row["light_score"])
-            match_score = 0
-            if dark_score > light_score:
-                match_score = 1
-            elif dark_score < light_score:
-                match_score = 0
-            else:
-                match_score = 0.5
-            moves = [row[f"{i}"] for i in range(60)]
-            labels = []
-            epochs = []
-            if args.use_theoscore:
-                for i in range(60):
-                    try:
-                        score = float(row[f"l{i}"])
-                        labels.append( (score, 1-score) )
-                        epochs.append(20)
-                    except:
-                        labels.append( (match_score, 1-match_score) )
-                        epochs.append(10)
-            else:
-                for _ in range(60):
-                    labels.append( (match_score, 1-match_score) )
-                    epochs.append(10)
-            
-            if args.separate_dark_and_light:
-                createDataByPlayer(dark_data, light_data, moves, labels, epochs)
-            else:
-                createDataByPlayer(data, moves, labels, epochs)
+    # positions of records are replayed once and cached
+    print(f"open dataset of records: {csvfilename}")
+    dataset = openDataset(csvfilename, args.cache_dir)
 
 
     # train neural network
     print("train neural network")
 
-    # all states extracted by the records will be too large,
-    # so separate data into some groups and train the model
-    batch_size = 65536
-    
     if args.separate_dark_and_light:
-        num_dark_states = len(dark_data)
-        for i in range(num_dark_states//batch_size + 1):
-            print(f"training dark model with {i}th group")
-            
-            start = i * batch_size
-            end = (i+1) * batch_size
-            dark_x_train_weak = [t[0] for t in dark_data[start:end] if t[2] == 10]
-            dark_x_train_strong = [t[0] for t in dark_data[start:end] if t[2] == 20]
-            dark_y_train_weak = [t[1] for t in dark_data[start:end] if t[2] == 10]
-            dark_y_train_strong = [t[1] for t in dark_data[start:end] if t[2] == 20]
-            dark_model.fit(np.array(dark_x_train_weak),
-                           np.array(dark_y_train_weak),
-                           epochs=10)
-            dark_model.fit(np.array(dark_x_train_strong),
-                           np.array(dark_y_train_strong),
-                           epochs=20)
-            del dark_x_train_weak, dark_x_train_strong
-            del dark_y_train_weak, dark_y_train_strong
-        num_light_states = len(light_data)
-        for i in range(num_light_states//batch_size + 1):
-            print(f"training light model with {i}th group")
-            
-            start = i * batch_size
-            end = (i+1) * batch_size
-            light_x_train_weak = [t[0] for t in light_data[start:end] if t[2] == 10]
-            light_x_train_strong = [t[0] for t in light_data[start:end]
-                                    if t[2] == 20]
-            light_y_train_weak = [t[1] for t in light_data[start:end] if t[2] == 10]
-            light_y_train_strong = [t[1] for t in light_data[start:end]
-                                    if t[2] == 20]
-            light_model.fit(np.array(light_x_train_weak),
-                            np.array(light_y_train_weak),
-                            epochs=10)
-            light_model.fit(np.array(light_x_train_strong),
-                            np.array(light_y_train_strong),
-                            epochs=20)
-            del light_x_train_weak, light_x_train_strong
-            del light_y_train_weak, light_y_train_strong
+        print("training dark model")
+        trainModel(dark_model, dataset, DARK_PLAYER, args.use_theoscore,
+                   args.batch_size, args.shuffle_buffer)
+        print("training light model")
+        trainModel(light_model, dataset, LIGHT_PLAYER, args.use_theoscore,
+                   args.batch_size, args.shuffle_buffer)
     else:
-        num_states = len(data)
-        for i in range(num_states//batch_size + 1):
-            print(f"training model with {i}th group")
-            
-            start = i * batch_size
-            end = (i+1) * batch_size
-            x_train_weak = [t[0] for t in data[start:end] if t[2] == 10]
-            x_train_strong = [t[0] for t in data[start:end] if t[2] == 20]
-            y_train_weak = [t[1] for t in data[start:end] if t[2] == 10]
-            y_train_strong = [t[1] for t in data[start:end] if t[2] == 20]
-            model.fit(np.array(x_train_weak), np.array(y_train_weak), epochs=10)
-            model.fit(np.array(x_train_strong), np.array(y_train_strong), epochs=20)
-            del x_train_weak, x_train_strong
-            del y_train_weak, y_train_strong
+        trainModel(model, dataset, None, args.use_theoscore,
+                   args.batch_size, args.shuffle_buffer)
 
 
     ## save model
@@ -1,37 +1,172 @@
 #import winsound
 import time
 import random
-import tensorflow as tf
 
+import bitboard
 from othello import *
+from transposition import TranspositionTable, EXACT, LOWER, UPPER, \
+                          MOVE_NONE, MOVE_PASS
+from move_ordering import MoveOrderer
+from endgame import EndgameSolver, SolverTimeout
+from numpy_model import NumpyModel
+from eval_cache import EvaluationCache
+from parallel_search import ParallelRootSearch
+from probcut import ProbCut
+from opening_book import loadOpeningBook
+from lazy_smp import LazySMPSearch
+from weighted_eval import weightedScore, weightedScores, weightedScoreBitboards
+
+
+# Exception which will be raised when the time for searching ran out
+class SearchTimeout(Exception):
+    pass
+
+
+def loadModel(model_file=None, backend="tensorflow"):
+    """Load the neural network model from the file, or create a new one if
+       model_file is None. backend is "tensorflow" (Keras model, which can
+       be trained) or "numpy" (inference only, without TensorFlow)."""
+    if backend == "numpy":
+        if model_file is None:
+            raise ValueError("numpy backend needs a model file")
+        print(f"load model file: {model_file}")
+        return NumpyModel.load(model_file)
+    elif backend != "tensorflow":
+        raise ValueError(f"Unknown model backend: {backend}")
+
+    import tensorflow as tf
+    if model_file is None:
+        return tf.keras.models.Sequential([
+            tf.keras.layers.Dense(16, input_shape=(64,), activation="relu"),
+            tf.keras.layers.Dense(2, activation="softmax")
+        ])
+    print(f"load model file: {model_file}")
+    return tf.keras.models.load_model(model_file)
 
 
 # abstract class  Othello AI which apply min-max
 class MinMaxOthelloAgent(OthelloPlayer):
 
-    def __init__(self, env=None, depth=1):
+    # evaluate all children of nodes at depth 1 by one evaluateBatch call
+    # (worth for evaluation functions with a large overhead per call)
+    batch_leaves = False
+
+    def __init__(self, env=None, depth=1, tt_size_mb=16, time_limit_ms=None,
+                 endgame_empties=None, endgame_mode="exact",
+                 eval_cache_size=1 << 16, workers=None, parallel_mode="root",
+                 probcut=None):
         super().__init__("MinMaxAI", env)
 
         self.win_util = None
         self.depth = depth
+        # if time limit is given, search deeper and deeper until time runs out
+        # (depth is ignored)
+        self.time_limit_ms = time_limit_ms
+        self.deadline = None
+        self.stop_flag = None   # shared value to stop searching if nonzero
+        self.completed_depth = 0
+        # search actions after the first one with null windows
+        self.use_pvs = True
+        # half width of the window around the score of the previous depth
+        # in iterative deepening (None to search with the full window).
+        # disabled by default, since re-searches cost more than they save
+        # with the transposition table for the scores in [0, 1]
+        self.aspiration_window = None
+        # parameters of Multi-ProbCut (ProbCut or its file name) to cut
+        # nodes predicted by shallower searches (None to disable)
+        if isinstance(probcut, str):
+            probcut = ProbCut.load(probcut)
+        self.probcut = probcut
         self.epsilon = 0   # randomness of choosing action
         self.debug_counter = 0;
+        # results of searched positions (None to disable)
+        if tt_size_mb:
+            self.transposition_table = TranspositionTable(tt_size_mb)
+        else:
+            self.transposition_table = None
+        # sorts actions before searching them (None to keep the board order)
+        self.move_orderer = MoveOrderer()
+        # solve the game perfectly when the number of blank squares is
+        # less than or equal to endgame_empties (None to disable).
+        # endgame_mode is "exact" (maximize discs) or "wld" (just win)
+        self.endgame_empties = endgame_empties
+        self.endgame_mode = endgame_mode
+        # evaluated scores of positions (None to disable)
+        if eval_cache_size:
+            self.eval_cache = EvaluationCache(eval_cache_size)
+        else:
+            self.eval_cache = None
+        # search with this number of processes (None to search in this
+        # process only). parallel_mode is "root" (split moves at the root)
+        # or "smp" (lazy SMP, share transposition table in shared memory)
+        self.workers = workers
+        self.parallel_mode = parallel_mode
+        self.parallel = None
+
+    def __getstate__(self):
+        # copies in worker processes don't need the game and the pool
+        state = self.__dict__.copy()
+        state["environment"] = None
+        state["parallel"] = None
+        return state
+
+    def close(self):
+        """Shut down worker processes of parallel search if any."""
+        if self.parallel is not None:
+            self.parallel.close()
+            self.parallel = None
 
     def setOrder(self, order):
+        # cached scores are evaluated in sight of the previous order
+        if self.eval_cache is not None and order != self.order:
+            self.eval_cache.clear()
         self.order = order
         if order == DARK_PLAYER:
             self.win_util = 1
         else:
             self.win_util = -1
+        # stored scores are evaluated in sight of the previous order
+        if self.transposition_table is not None:
+            self.transposition_table.clear()
+
+    @property
+    def engine(self):
+        """Engine of the environment used for searching (Othello by default)"""
+        if self.environment is None:
+            return Othello
+        return self.environment.engine
 
     def chooseAction(self):
         if random.random() < self.epsilon:
-            actions = Othello.smActions(self.order, self.environment.getState())
+            actions = self.engine.smActions(self.order, self.environment.getState())
             return random.choice(actions)
         else:
             self.debug_counter = 0
-            action, score = self.findMaxInMins(self.environment.getState(),
-                                               self.depth)
+            if self.transposition_table is not None:
+                self.transposition_table.newSearch()
+            if self.move_orderer is not None:
+                self.move_orderer.newSearch()
+            start = time.perf_counter()
+            result = None
+            if self.endgame_empties is not None:
+                result = self.solveEndgame(self.environment.getState(),
+                                           self.time_limit_ms)
+            if result is not None:
+                action, score = result
+                print(f"solved endgame ({self.endgame_mode})")
+            elif self.time_limit_ms is None and self.workers:
+                action, score = self.parallelSearch(
+                    self.environment.getState(), self.depth)
+            elif self.time_limit_ms is None:
+                action, score = self.search(self.environment.getState(),
+                                            self.depth)
+            else:
+                # the endgame solver may have used a part of the time
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                action, score = self.iterativeDeepening(
+                    self.environment.getState(),
+                    max(self.time_limit_ms - elapsed_ms, 1))
+                print(f"depth: {self.completed_depth}")
             print(self.debug_counter)
             # debug
             state = self.environment.getState()
@@ -46,137 +181,316 @@ class MinMaxOthelloAgent(OthelloPlayer):
         """Evaluate function, which calculates 'score' of the state."""
         raise NotImplementedError("This class is abstract!")
 
-    def findMaxInMins(self, state, depth):
-        """Find an action of maximum score in minimum scores within depth."""
-        self.debug_counter += 1;
-        if Othello.smTerminal(state) or depth <= 0:
-            return (None, self.evaluate(state))
-
-        max_score = -np.inf
-        max_action = None
-        player_me = self.order
-        opponent = 1 - self.order
-        actions = Othello.smActions(player_me, state)
-
-        # just check evaluations of all of possible next states
-        if depth == 1:
-            action_scores = \
-                [(action,
-                  self.evaluate(Othello.smResult(state, action, player_me)))
-                 for action in actions]
-            return max(action_scores, key=lambda pair: pair[1])
-
-        # find the maximum score in minimum scores
-        for action in actions:
-            new_state = Othello.smResult(state, action, player_me)
-            
-            # if the next state is terminal, check its utility and continue
-            if Othello.smTerminal(new_state):
-                # if the action makes you win, choose it
-                if Othello.smUtility(new_state) == self.win_util:
-                    return (action, self.evaluate(new_state))
-                # otherwise it must be the case you lose or draw,
-                # but remember the action in order to compare it later
-                evaluation = self.evaluate(new_state)
-                if max_score < evaluation:
-                    max_score = evaluation;
-                    max_action = action
-                continue
-
-            actions2 = Othello.smActions(opponent, new_state)
-            _min_score = np.inf
-            # find the minimum score in child nodes
-            for action2 in actions2:
-                new_state2 = Othello.smResult(new_state, action2, opponent)
-                _min_score = min(_min_score,
-                                 self.findMaxInMins(new_state2, depth-2)[1])
-                # If the current min-of-maxs opponent may choose is less than
-                # the current max-of-mins (you choose), this your action
-                # is not best choice because the minimum score of action2 must
-                # be less than the current max-of-mins.
-                # That is, you should not choose this action anymore.
-                if _min_score < max_score:
-                    break
-            # If min-of-maxs is larger than the current max score,
-            # this is better choice for you
-            if max_score < _min_score:
-                max_score = _min_score
-                max_action = action
-
-        if max_action == None:
-            # no way but lose!
-            return (random.choice(actions), max_score)
+    def evaluateBatch(self, states):
+        """Evaluate a list of states and return the list of scores."""
+        return [self.evaluate(state) for state in states]
+
+    def evaluatePosition(self, board):
+        """Evaluate the position of the search board (subclasses may
+           evaluate the board without converting it to state)."""
+        return self.evaluate(board.getState())
+
+    def evaluateBoard(self, board):
+        """Evaluate the position of the search board through the cache."""
+        cache = self.eval_cache
+        if cache is None:
+            return self.evaluatePosition(board)
+        value = cache.get(board.key)
+        if value is None:
+            value = self.evaluatePosition(board)
+            cache.put(board.key, value)
+        return value
+
+    @staticmethod
+    def encodeMove(action, size):
+        """Encode action into an integer stored in transposition table"""
+        if action is None:
+            return MOVE_NONE
+        elif type(action) != tuple:
+            return MOVE_PASS
+        return action[0]*size + action[1]
+
+    @staticmethod
+    def decodeMove(move, size):
+        """Decode an integer stored in transposition table into action"""
+        if move == MOVE_NONE:
+            return None
+        elif move == MOVE_PASS:
+            return "pass"
+        return divmod(move, size)
+
+    def search(self, state, depth, alpha=-np.inf, beta=np.inf,
+               first_action=None):
+        """Find the best action and its score within depth
+           (scores are evaluated in sight of this agent)."""
+        # state may be given as an array or a search board
+        if isinstance(state, np.ndarray):
+            board = self.engine.smSearchBoard(state, self.order)
+        else:
+            board = state
+        if board.player == self.order:
+            return self.negamax(board, depth, alpha, beta, first_action)
+        action, score = self.negamax(board, depth, -beta, -alpha, first_action)
+        return (action, -score)
+
+    def parallelSearch(self, state, depth):
+        """Same as search, but searched by worker processes
+           (evaluate must work in other processes)."""
+        if self.parallel is None:
+            if self.parallel_mode == "root":
+                self.parallel = ParallelRootSearch(self, self.workers)
+            elif self.parallel_mode == "smp":
+                self.parallel = LazySMPSearch(self, self.workers)
+            else:
+                raise ValueError(f"Unknown parallel mode: {self.parallel_mode}")
+        return self.parallel.search(state, depth)
+
+    def solveEndgame(self, state, timeout_ms=None):
+        """Find the perfect action by endgame solver if the number of blank
+           squares is small enough. Return (action, score) where score is
+           the disc differential ("exact" mode) or 1/0/-1 ("wld" mode),
+           or None if not solved."""
+        black, white = BitboardOthello.toBitboards(state)
+        size = state.shape[0]
+        num_blank = size*size - bitboard.popcount(black | white)
+        if self.endgame_empties is None or num_blank > self.endgame_empties:
+            return None
+        if self.order == DARK_PLAYER:
+            player, opponent = black, white
         else:
-            return (max_action, max_score)
-
-    def findMinInMaxs(self, state, depth):
-        """Find an action of minimum score in maximum scores within depth."""
-        if Othello.smTerminal(state) or depth <= 0:
-            return (None, self.evaluate(state))
-
-        min_score = np.inf
-        min_action = None
-        player_me = self.order
-        opponent = 1 - self.order
-        actions = Othello.smActions(player_me, state)
-
-        # just check evaluations of all of possible next states
-        if depth == 1:
-            action_scores = \
-                [(action,
-                  self.evaluate(Othello.smResult(state, action, player_me)))
-                 for action in actions]
-            return min(action_scores, key=lambda pair: pair[1])
-
-        # find the minimum score in maximum scores
-        for action in actions:
-            new_state = Othello.smResult(state, action, player_me)
-            
-            # if the next state is terminal, check its utility and continue
-            if Othello.smTerminal(new_state):
-                # if the action makes you win, choose it
-                if Othello.smUtility(new_state) == self.win_util:
-                    return (action, self.evaluate(new_state))
-                # otherwise it must be the case you lose or draw,
-                # but remember the action in order to compare it later
-                evaluation = self.evaluate(new_state)
-                if evaluation < min_score:
-                    min_score = evaluation
-                    min_action = action
-                continue
-            
-            actions2 = Othello.smActions(opponent, new_state)
-            _max_score = -np.inf
-            # find the minimum score in child nodes
-            for action2 in actions2:
-                new_state2 = Othello.smResult(new_state, action2, opponent)
-                _max_score = max(_max_score,
-                                 self.findMinInMaxs(new_state2, depth-2)[1])
-                # If the current max-of-mins opponent may choose is more than
-                # the current min-of-maxs (you choose), this your action
-                # is not best choice because the maximum score of action2 must
-                # be more than the current min-of-maxs.
-                # That is, you should not choose this action anymore.
-                if min_score < _max_score:
-                    break
-            # If min-of-maxs is larger than the current max score,
-            # this is better choice for you
-            if _max_score < min_score:
-                min_score = _max_score
-                min_action = action
-
-        if min_action == None:
-            # no way but lose!
-            return (random.choice(actions), min_score)
+            player, opponent = white, black
+        solver = EndgameSolver(size)
+        try:
+            sq, score = solver.bestMove(player, opponent, self.endgame_mode,
+                                        timeout_ms)
+        except SolverTimeout:
+            return None
+        finally:
+            self.debug_counter += solver.nodes
+        if sq is None:
+            return ("pass", score)
+        return (divmod(sq, size), score)
+
+    def iterativeDeepening(self, state, time_limit_ms, max_depth=None):
+        """Search with depth 1, 2, 3... until time runs out and return
+           the result of the deepest completed search."""
+        self.deadline = time.perf_counter() + time_limit_ms / 1000
+        if isinstance(state, np.ndarray):
+            root = self.engine.smSearchBoard(state, self.order)
         else:
-            return (min_action, min_score)
+            root = state
+        # searching deeper than the number of blank squares is meaningless
+        num_blank = root.size*root.size - sum(root.score())
+        if max_depth is None or max_depth > num_blank:
+            max_depth = max(num_blank, 1)
+
+        # if even depth 1 can't be completed, choose the first action
+        result = (root.actions(self.order)[0], -np.inf)
+        self.completed_depth = 0
+        try:
+            for depth in range(1, max_depth+1):
+                result = self.aspirationSearch(root, depth, result)
+                self.completed_depth = depth
+        except SearchTimeout:
+            pass
+        finally:
+            self.deadline = None
+        return result
+
+    def aspirationSearch(self, root, depth, previous):
+        """Search with a narrow window around the score of the previous
+           depth, widening the window while the score is out of it."""
+        action, score = previous
+        delta = self.aspiration_window
+        failures = 0
+        while True:
+            # give up the narrow window after failing twice
+            if delta is None or depth == 1 or not np.isfinite(score) \
+               or failures >= 2:
+                alpha, beta = -np.inf, np.inf
+            else:
+                alpha, beta = score - delta, score + delta
+            # the board is left in the middle of search on timeout,
+            # so search a copy of it
+            result = self.search(root.copy(), depth, alpha, beta,
+                                 first_action=action)
+            if alpha < result[1] < beta or (alpha, beta) == (-np.inf, np.inf):
+                return result
+            action, score = result
+            delta *= 4
+            failures += 1
+
+    def negamax(self, board, depth, alpha, beta, first_action=None, ply=0):
+        """Find the best action and its score for the player to move
+           with alpha-beta pruning. The score is evaluated in sight of
+           the player to move, so that each player maximizes -(child score).
+           ply is the distance from the root.
+           Return (action, score)."""
+        self.debug_counter += 1;
+        # check the time limit (and the request to stop) once in a while
+        if self.deadline is not None and (self.debug_counter & 0x3F) == 0 \
+           and (time.perf_counter() > self.deadline or
+                (self.stop_flag is not None and self.stop_flag.value)):
+            raise SearchTimeout()
+        player = board.player
+        sign = 1 if player == self.order else -1
+        if depth <= 0:
+            return (None, sign * self.evaluateBoard(board))
+
+        actions = board.actions(player)
+        if actions[0] == "pass":
+            if board.actions(1 - player)[0] == "pass":
+                # neither player can move, so the game is over
+                return (None, sign * self.evaluateBoard(board))
+            # passing doesn't consume depth
+            undo = board.make_move("pass", player)
+            score = -self.negamax(board, depth, -beta, -alpha, ply=ply+1)[1]
+            board.unmake_move(undo)
+            return ("pass", score)
+
+        # look up the result of the same position searched before
+        tt = self.transposition_table
+        alpha_orig = alpha
+        hash_action = None
+        if tt is not None:
+            entry = tt.probe(board.key)
+            if entry is not None:
+                score, bound, entry_depth, move = entry
+                hash_action = self.decodeMove(move, board.size)
+                if entry_depth >= depth:
+                    if bound == EXACT:
+                        return (hash_action, score)
+                    elif bound == LOWER:
+                        alpha = max(alpha, score)
+                    else:
+                        beta = min(beta, score)
+                    if alpha >= beta:
+                        return (hash_action, score)
+
+        # cut the node if shallower searches predict the result
+        if self.probcut is not None and ply > 0:
+            score = self.probCut(board, depth, alpha, beta, ply)
+            if score is not None:
+                return (None, score)
+
+        # search the best action found before at first
+        if self.move_orderer is not None:
+            actions = self.move_orderer.order(board, actions, ply, depth,
+                                              hash_action)
+        elif hash_action in actions:
+            actions.remove(hash_action)
+            actions.insert(0, hash_action)
+        if first_action in actions:
+            actions.remove(first_action)
+            actions.insert(0, first_action)
+
+        if depth == 1 and self.batch_leaves:
+            best_action, best_score = self._searchLeaves(board, actions)
+            if best_score >= beta and self.move_orderer is not None:
+                self.move_orderer.recordCutoff(best_action, player, ply, depth)
+            actions = ()
+        else:
+            best_score = -np.inf
+            best_action = actions[0]
+        for i, action in enumerate(actions):
+            undo = board.make_move(action, player)
+            if i == 0 or not self.use_pvs:
+                score = -self.negamax(board, depth-1, -beta, -alpha,
+                                      ply=ply+1)[1]
+            else:
+                # principal variation search: prove that the action is not
+                # better than alpha with a null window, and search again
+                # with the full window only if it is
+                null_beta = np.nextafter(alpha, np.inf)
+                score = -self.negamax(board, depth-1, -null_beta, -alpha,
+                                      ply=ply+1)[1]
+                if alpha < score < beta:
+                    score = -self.negamax(board, depth-1, -beta, -alpha,
+                                          ply=ply+1)[1]
+            board.unmake_move(undo)
+            if score > best_score:
+                best_score = score
+                best_action = action
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if self.move_orderer is not None:
+                            self.move_orderer.recordCutoff(action, player,
+                                                           ply, depth)
+                        break
+
+        if tt is not None:
+            if best_score <= alpha_orig:
+                bound = UPPER
+            elif best_score >= beta:
+                bound = LOWER
+            else:
+                bound = EXACT
+            tt.store(board.key, best_score, bound, depth,
+                     self.encodeMove(best_action, board.size))
+        return (best_action, best_score)
+
+    def probCut(self, board, depth, alpha, beta, ply):
+        """Predict the score of the search of depth by shallower searches
+           (Multi-ProbCut). Return beta (alpha) if the score is likely to be
+           at least beta (at most alpha), or None if not predictable."""
+        checks = self.probcut.getChecks(depth, self.order, sum(board.score()))
+        # parameters are fitted in sight of this agent
+        sign = 1 if board.player == self.order else -1
+        for shallow, t, a, b, sigma in checks:
+            if beta < np.inf:
+                bound = (beta + t*sigma - sign*b) / a
+                score = self.negamax(board, shallow, np.nextafter(bound, -np.inf),
+                                     bound, ply=ply)[1]
+                if score >= bound:
+                    return beta
+            if alpha > -np.inf:
+                bound = (alpha - t*sigma - sign*b) / a
+                score = self.negamax(board, shallow, bound,
+                                     np.nextafter(bound, np.inf), ply=ply)[1]
+                if score <= bound:
+                    return alpha
+        return None
+
+    def _searchLeaves(self, board, actions):
+        """Evaluate all results of actions at once and return the best
+           (action, score) in sight of the player to move."""
+        player = board.player
+        sign = 1 if player == self.order else -1
+        cache = self.eval_cache
+        evaluations = [None] * len(actions)
+        keys = [None] * len(actions)
+        missed = []
+        states = []
+        for i, action in enumerate(actions):
+            undo = board.make_move(action, player)
+            if cache is not None:
+                keys[i] = board.key
+                evaluations[i] = cache.get(board.key)
+            if evaluations[i] is None:
+                missed.append(i)
+                states.append(board.getState().copy())
+            board.unmake_move(undo)
+        self.debug_counter += len(actions)
+        if states:
+            for i, evaluation in zip(missed, self.evaluateBatch(states)):
+                evaluations[i] = evaluation
+                if cache is not None:
+                    cache.put(keys[i], evaluation)
+        best_score = -np.inf
+        best_action = actions[0]
+        for action, evaluation in zip(actions, evaluations):
+            if sign * evaluation > best_score:
+                best_score = sign * evaluation
+                best_action = action
+        return (best_action, best_score)
 
 class NumDiscMinMaxOthelloAgent(MinMaxOthelloAgent):
     
     # override evaluate function
     def evaluate(self, state):
         """Evaluation function which simply counts up discs"""
-        score = Othello.smScore(state)
+        score = self.engine.smScore(state)
         return score[self.order] / (score[0] + score[1])
 
 class CornerWeightedMinMaxOthelloAgent(MinMaxOthelloAgent):
@@ -186,33 +500,27 @@ class CornerWeightedMinMaxOthelloAgent(MinMaxOthelloAgent):
         """Evaluate function which gives weight to the corners"""
         # if self.order = DARK_PLAYER(=0),  AI tries to maximize score[0]/total
         # if self.order = LIGHT_PLAYER(=1), AI tries to maximize score[1]/total
-        num_discs = [0,0,0]    # number of discs of [BLANK, WHITE, BLACK]
-        size = state.shape[0]
-        for row in range(1, size-1):
-            for col in range(1, size-1):
-                num_discs[ state[row,col]-1 ] += 1
-        # have weights on discs on the edge
-        for row in range(1, size-1):
-            num_discs[ state[row,0]-1 ] += 5
-        for row in range(1, size-1):
-            num_discs[ state[row,size-1]-1 ] += 5
-        for col in range(1, size-1):
-            num_discs[ state[0,col]-1 ] += 5
-        for col in range(1, size-1):
-            num_discs[ state[size-1,col]-1 ] += 5
-        # have weights on discs on the corner
-        num_discs[ state[0,0]-1 ] += 10
-        num_discs[ state[0,size-1]-1 ] += 10
-        num_discs[ state[size-1,0]-1] += 10
-        num_discs[ state[size-1,size-1]-1 ] += 10
-
-        score = (num_discs[2], num_discs[1])  # score of (dark, light)
+        # (discs on the edges count 5 and on the corners count 10)
+        score = weightedScore(state)  # score of (dark, light)
         return score[self.order] / (score[0] + score[1])
 
+    def evaluateBatch(self, states):
+        """Evaluate states at once with weights on the corners"""
+        scores = weightedScores(states)
+        return (scores[:, self.order] / scores.sum(axis=1)).tolist()
+
+    def evaluatePosition(self, board):
+        """Evaluate the search board, counting bitboards directly if any"""
+        if isinstance(board, BitboardSearchBoard):
+            score = weightedScoreBitboards(board.black, board.white, board.size)
+            return score[self.order] / (score[0] + score[1])
+        return self.evaluate(board.getState())
+
 class ModelMinMaxOthelloAgent(MinMaxOthelloAgent):
 
     def __init__(self, env=None, depth=1, model_file=None,
-                 state_start=0, state_end=61, learn_epoch=10):
+                 state_start=0, state_end=61, learn_epoch=10,
+                 model_backend="tensorflow"):
         super().__init__(env, depth)
 
         self.all_states = []
@@ -222,32 +530,28 @@ class ModelMinMaxOthelloAgent(MinMaxOthelloAgent):
         self.learn_epoch = learn_epoch
 
         # load or create neural network model
-        if model_file is None:
-            self.model = tf.keras.models.Sequential([
-                tf.keras.layers.Dense(16, input_shape=(64,), activation="relu"),
-                tf.keras.layers.Dense(2, activation="softmax")
-            ])
-        else:
-            print(f"load model file: {model_file}")
-            self.model = tf.keras.models.load_model(model_file)
+        self.model = loadModel(model_file, model_backend)
+
+    # leaves are evaluated by one forward pass of the model
+    batch_leaves = True
 
     # override evaluate function
     def evaluate(self, state):
         """Evaluate function using neural network"""
-        if Othello.smTerminal(state):
-            util = Othello.smUtility(state)
-            if util == self.win_util:
-                return np.inf
-            elif util == -self.win_util:
-                return -np.inf
-            else:
-                return self.model.predict(
-                    normalizeDisc(state).flatten().reshape(1,64)
-                    )[0][self.order]
-        
-        return self.model.predict(
-            normalizeDisc(state).flatten().reshape(1,64)
-            )[0][self.order]
+        return self.evaluateBatch([state])[0]
+
+    def evaluateBatch(self, states):
+        """Evaluate states using neural network at once"""
+        x = normalizeDisc(np.asarray(states)).reshape(len(states), -1)
+        scores = self.model.predict_on_batch(x)[:, self.order].tolist()
+        for i, state in enumerate(states):
+            if self.engine.smTerminal(state):
+                util = self.engine.smUtility(state)
+                if util == self.win_util:
+                    scores[i] = np.inf
+                elif util == -self.win_util:
+                    scores[i] = -np.inf
+        return scores
 
     # override the behavior when state and reward are notified
     def notifyStateAndReward(self, turn, state, reward):
@@ -255,7 +559,7 @@ class ModelMinMaxOthelloAgent(MinMaxOthelloAgent):
             print("notified and append")
             # remember all states in order to train the model later
             self.all_states.append(normalizeDisc(state.flatten()))
-        if self.isLearning and Othello.smTerminal(state):
+        if self.isLearning and self.engine.smTerminal(state):
             print("len of all states: ", len(self.all_states))
             print(self.all_states[-1])
             # train the model
@@ -278,6 +582,9 @@ class ModelMinMaxOthelloAgent(MinMaxOthelloAgent):
         print("train model for states: ", states)
         y_train = [ (label, 1-label) for _ in range(len(states))]
         self.model.fit(np.array(states), y_train, epochs=epoch)
+        # cached scores were evaluated by the old model
+        if self.eval_cache is not None:
+            self.eval_cache.clear()
 
     def saveModel(self, filename):
         self.model.save(filename)
@@ -285,48 +592,93 @@ class ModelMinMaxOthelloAgent(MinMaxOthelloAgent):
 
 class HybridOthelloAgent(MinMaxOthelloAgent):
 
-    def __init__(self, env=None, depth=1, model_file=None):
+    # leaves in the later state are evaluated by one forward pass
+    batch_leaves = True
+
+    def __init__(self, env=None, depth=1, model_file=None,
+                 model_backend="tensorflow"):
         super().__init__(env, depth)
 
         # load or create neural network model
-        if model_file is None:
-            self.model = tf.keras.models.Sequential([
-                tf.keras.layers.Dense(16, input_shape=(64,), activation="relu"),
-                tf.keras.layers.Dense(2, activation="softmax")
-            ])
-        else:
-            print(f"load model file: {model_file}")
-            self.model = tf.keras.models.load_model(model_file)
+        self.model = loadModel(model_file, model_backend)
 
     # override evaluate function
     def evaluate(self, state):
         """Evaluate function using neural network or my function"""
-        num_discs = sum(Othello.smScore(state))
+        num_discs = np.count_nonzero(state != BLANK)
         if num_discs < 40:
             # in the earlier state, evaluate with corner weighted function
-            num_discs = [0,0,0]
-            size = state.shape[0]
-            for row in range(1, size-1):
-                for col in range(1, size-1):
-                    num_discs[ state[row,col]-1 ] += 1
-            # have weights on discs on the edge
-            for row in range(1, size-1):
-                num_discs[ state[row,0]-1 ] += 5
-            for row in range(1, size-1):
-                num_discs[ state[row,size-1]-1 ] += 5
-            for col in range(1, size-1):
-                num_discs[ state[0,col]-1 ] += 5
-            for col in range(1, size-1):
-                num_discs[ state[size-1,col]-1 ] += 5
-            # have weights on discs on the corner
-            num_discs[ state[0,0]-1 ] += 10
-            num_discs[ state[0,size-1]-1 ] += 10
-            num_discs[ state[size-1,0]-1] += 10
-            num_discs[ state[size-1,size-1]-1 ] += 10
-
-            score = (num_discs[2], num_discs[1])  # score of (dark, light)
+            score = weightedScore(state)  # score of (dark, light)
             return score[self.order] / (score[0] + score[1])
         else:
             # in the later state, evaluate with neural network
             return self.model.predict(
                 normalizeDisc(state).flatten().reshape(1,64))[0][self.order]
+
+    def evaluateBatch(self, states):
+        """Evaluate states, states in the later state by neural network
+           at once"""
+        states = np.asarray(states)
+        num_discs = np.count_nonzero(states.reshape(len(states), -1) != BLANK,
+                                     axis=1)
+        earlier = np.flatnonzero(num_discs < 40)
+        later = np.flatnonzero(num_discs >= 40)
+        scores = [None] * len(states)
+        if len(earlier):
+            weighted = weightedScores(states[earlier])
+            ratios = weighted[:, self.order] / weighted.sum(axis=1)
+            for i, ratio in zip(earlier, ratios.tolist()):
+                scores[i] = ratio
+        if len(later):
+            x = normalizeDisc(states[later]).reshape(len(later), -1)
+            predictions = self.model.predict_on_batch(x)[:, self.order]
+            for i, prediction in zip(later, predictions.tolist()):
+                scores[i] = prediction
+        return scores
+
+
+class BookOthelloAgent(OthelloPlayer):
+    """Agent which plays moves of the opening book while the position is
+       in the book, and lets the other agent choose after that"""
+
+    def __init__(self, agent, book, min_count=1, policy="count"):
+        super().__init__(agent.name, agent.environment)
+        self.agent = agent
+        if isinstance(book, str):
+            book = loadOpeningBook(book)
+        self.book = book
+        self.min_count = min_count
+        self.policy = policy
+
+    def setEnvironment(self, env):
+        super().setEnvironment(env)
+        self.agent.setEnvironment(env)
+
+    def setOrder(self, order):
+        super().setOrder(order)
+        self.agent.setOrder(order)
+
+    def chooseAction(self):
+        state = self.environment.getState()
+        size = state.shape[0]
+        if size == self.book.size:
+            black, white = BitboardOthello.toBitboards(state)
+            if self.order == DARK_PLAYER:
+                sq = self.book.chooseMove(black, white, self.min_count,
+                                          self.policy)
+            else:
+                sq = self.book.chooseMove(white, black, self.min_count,
+                                          self.policy)
+            if sq is not None:
+                print("book move")
+                return divmod(sq, size)
+        return self.agent.chooseAction()
+
+    def notifyStateAndReward(self, turn, state, reward):
+        self.agent.notifyStateAndReward(turn, state, reward)
+
+    def __getattr__(self, name):
+        # other attributes (e.g. saveModel) are the ones of the agent
+        if name == "agent":
+            raise AttributeError(name)
+        return getattr(self.agent, name)
@@ -3,13 +3,25 @@ import csv
 import argparse
 
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.transforms import Bbox
 
 from othello import *
 from othello_models import ModelMinMaxOthelloAgent
 
 
+# matplotlib is imported only when graph or GUI is requested,
+# since importing it takes long time
+plt = None
+Bbox = None
+
+def importPyplot():
+    """Import matplotlib modules into the globals of this module."""
+    global plt, Bbox
+    if plt is None:
+        import matplotlib.pyplot
+        from matplotlib.transforms import Bbox as _Bbox
+        plt = matplotlib.pyplot
+        Bbox = _Bbox
+
 
 def searchMove(data):
     for i, d in enumerate(data):
@@ -75,6 +87,10 @@ if __name__ == '__main__':
 
     parser.add_argument("-m", "--model-file",
                         help="model file to evaluate the game state")
+    parser.add_argument("-b", "--model-backend",
+                        choices=["tensorflow", "numpy"],
+                        default="tensorflow",
+                        help="library to evaluate the model with")
     parser.add_argument("-g", "--show-graph",
                         action="store_true",
                         help="show a graph of evaluation by AI")
@@ -111,10 +127,14 @@ if __name__ == '__main__':
     game = Othello(8)
     
     if args.model_file:
-        model = ModelMinMaxOthelloAgent(model_file=args.model_file)
+        model = ModelMinMaxOthelloAgent(model_file=args.model_file,
+                                        model_backend=args.model_backend)
         # evaluate the state in sight of the dark player
         model.setOrder(0)
     
+    if args.show_graph or args.visualize:
+        importPyplot()
+
     if args.show_graph:
         plt.figure()
         xs = np.array([i for i in range(len(all_states))])
@@ -125,7 +145,7 @@ if __name__ == '__main__':
         plt.plot(xs, scores, color="green", label="score")
         plt.title("Score")
         if args.model_file:
-            evals = [model.evaluate(state) for state in all_states]
+            evals = model.evaluateBatch(all_states)
             plt.plot(xs, evals, color="red", label="AI")
             plt.title("Score and Evaluation by AI")
         plt.xlabel("moves")
@@ -0,0 +1,123 @@
+## Parallel search splitting the moves at the root into processes.
+## The first (most promising) move is searched in this process to get a
+## good bound, and the other moves are searched by a pool of processes,
+## each with its own copy of the agent (young brothers wait).
+## The best score so far and the index of its move are shared between the
+## processes, so each move is searched with the latest alpha bound.
+## Ties are broken by the order of the moves, so the result is the same
+## as the sequential search regardless of the timing of the processes.
+
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+
+# state of worker processes
+_agent = None
+_shared = None    # [alpha, index of the move which got alpha]
+_search_id = None
+
+def _initWorker(agent, shared):
+    global _agent, _shared
+    _agent = agent
+    _shared = shared
+
+def _readAlpha(shared):
+    with shared.get_lock():
+        return (shared[0], shared[1])
+
+def _updateAlpha(shared, score, index):
+    """Raise the shared alpha if score is better (or as good and
+       the move comes earlier)."""
+    with shared.get_lock():
+        if score > shared[0] or (score == shared[0] and index < shared[1]):
+            shared[0] = score
+            shared[1] = index
+
+def _searchMove(search_id, engine, state, order, depth, index, action):
+    """Search the move at the root in the worker and return
+       (index, score, number of nodes)."""
+    global _search_id
+    agent = _agent
+    if agent.order != order:
+        agent.setOrder(order)
+    if search_id != _search_id:
+        # entries of other roots may be deeper, which would make the
+        # results depend on which moves the worker searched before
+        _search_id = search_id
+        if agent.transposition_table is not None:
+            agent.transposition_table.clear()
+        if agent.move_orderer is not None:
+            agent.move_orderer.clear()
+    return _searchChild(agent, _shared, engine.smSearchBoard(state, order),
+                        depth, index, action)
+
+def _searchChild(agent, shared, board, depth, index, action):
+    alpha, holder = _readAlpha(shared)
+    if index < holder:
+        # this move wins a tie, so a score equal to alpha must be exact
+        alpha = np.nextafter(alpha, -np.inf)
+    agent.debug_counter = 0
+    board.make_move(action, board.player)
+    score = -agent.negamax(board, depth-1, -np.inf, -alpha, ply=1)[1]
+    if score > alpha:
+        _updateAlpha(shared, score, index)
+    return (index, score, agent.debug_counter)
+
+
+class ParallelRootSearch():
+
+    def __init__(self, agent, workers=None):
+        self.agent = agent
+        self.workers = workers or multiprocessing.cpu_count()
+        self.shared = multiprocessing.Array("d", [-np.inf, np.inf])
+        self.executor = None
+        self.search_ids = itertools.count()
+
+    def close(self):
+        """Shut down the worker processes."""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def search(self, state, depth):
+        """Find the best action and its score of the agent's player within
+           depth (the same result as agent.search)."""
+        agent = self.agent
+        engine = agent.engine
+        board = engine.smSearchBoard(state, agent.order)
+        actions = board.actions()
+        if depth <= 1 or len(actions) <= 1:
+            return agent.search(board, depth)
+        if agent.move_orderer is not None:
+            actions = agent.move_orderer.order(board, actions, 0, depth)
+        if self.executor is None:
+            # workers get copies of the agent at this point
+            self.executor = ProcessPoolExecutor(
+                self.workers, initializer=_initWorker,
+                initargs=(agent, self.shared))
+
+        # search the first move here to get the bound for the others
+        self.shared[0] = -np.inf
+        self.shared[1] = np.inf
+        counter = agent.debug_counter
+        _, score, nodes = _searchChild(agent, self.shared, board.copy(), depth,
+                                       0, actions[0])
+        scores = {0: score}
+        nodes += counter
+
+        search_id = next(self.search_ids)
+        futures = [self.executor.submit(_searchMove, search_id, engine, state,
+                                        agent.order, depth, index, action)
+                   for index, action in enumerate(actions) if index > 0]
+        for future in as_completed(futures):
+            index, score, n = future.result()
+            scores[index] = score
+            nodes += n
+        agent.debug_counter = nodes + 1
+
+        # the best score with the earliest move is exact (see _searchChild)
+        best_index = min(scores, key=lambda i: (-scores[i], i))
+        return (actions[best_index], scores[best_index])
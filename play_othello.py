@@ -3,8 +3,6 @@ import sys
 import time
 import random
 
-import tensorflow as tf
-
 from othello import *
 from othello_models import *
   
@@ -24,6 +22,24 @@ if __name__ == "__main__":
         "NL":   "OthelloAIModel_64_16_16_2_dropout_learning.h5",
     }
 
+    # use bitboard engine for searching if requested
+    backend = "numpy"
+    if "--bitboard" in sys.argv:
+        sys.argv.remove("--bitboard")
+        backend = "bitboard"
+    # evaluate models with numpy instead of TensorFlow if requested
+    # (learning players always use TensorFlow to train their models)
+    model_backend = "tensorflow"
+    if "--numpy-model" in sys.argv:
+        sys.argv.remove("--numpy-model")
+        model_backend = "numpy"
+    # play moves of the opening book first if given
+    book = None
+    if "--book" in sys.argv:
+        i = sys.argv.index("--book")
+        book = loadOpeningBook(sys.argv[i+1])
+        del sys.argv[i:i+2]
+
     if len(sys.argv) < 3:
         raise SyntaxError("give two players!")
 
@@ -33,11 +49,14 @@ if __name__ == "__main__":
         first.name = "Corner weighted AI"
     elif sys.argv[1] == "Hybrid":
         first = HybridOthelloAgent(None, depth=4,
-                                   model_file="OthelloAIModel_64_16_16_2_dropout.h5")
+                                   model_file="OthelloAIModel_64_16_16_2_dropout.h5",
+                                   model_backend=model_backend)
         first.name = sys.argv[1]
     elif sys.argv[1] in model_files.keys():
         first = ModelMinMaxOthelloAgent(None, depth=4,
-                                        model_file=model_files[sys.argv[1]])
+                                        model_file=model_files[sys.argv[1]],
+                                        model_backend=model_backend
+                                        if sys.argv[1] != "L" else "tensorflow")
         first.name = sys.argv[1]
     elif sys.argv[1][:5] == "file:":
         filename = sys.argv[1][5:]
@@ -55,11 +74,14 @@ if __name__ == "__main__":
         second.name = "Corner weighted AI"
     elif sys.argv[2] == "Hybrid":
         second = HybridOthelloAgent(None, depth=4,
-                                   model_file="OthelloAIModel_64_16_16_2_dropout.h5")
+                                   model_file="OthelloAIModel_64_16_16_2_dropout.h5",
+                                   model_backend=model_backend)
         second.name = sys.argv[2]
     elif sys.argv[2] in model_files.keys():
         second = ModelMinMaxOthelloAgent(None, depth=4,
-                                        model_file=model_files[sys.argv[2]])
+                                        model_file=model_files[sys.argv[2]],
+                                        model_backend=model_backend
+                                        if sys.argv[2] != "L" else "tensorflow")
         second.name = sys.argv[2]
     elif sys.argv[2][:5] == "file:":
         filename = sys.argv[2][5:]
@@ -71,8 +93,14 @@ if __name__ == "__main__":
     if second.name == "L" or sys.argv[2][:5] == "file:":
         second.isLearning = True
 
+    if book is not None:
+        if not isinstance(first, PlayerYou):
+            first = BookOthelloAgent(first, book)
+        if not isinstance(second, PlayerYou):
+            second = BookOthelloAgent(second, book)
+
     # start game
-    game = Othello(8, first, second)
+    game = Othello(8, first, second, backend=backend)
     game.play()
 
     # if Learning AI losed, save trained AI model
@@ -0,0 +1,324 @@
+## Dataset of positions replayed from game records, cached in .npy files.
+## A source file (wtb, WTH csv or csv of records) is replayed once by
+## batch_replay and the positions are written into shards of a directory
+## named by the hash of the content of the source, the preprocessing
+## options and the version of the format, so that the following runs just
+## memory-map the shards and a changed source is never read from stale
+## cache.
+## Directory: manifest.json (written last) and for each shard
+##   states_NNNNN.npy  (M, 64) int8 positions (1: black, -1: white, 0: blank)
+##   info_NNNNN.npy    (M,) POSITION_DTYPE labels and metadata
+## For training, batches are streamed from the shards through a bounded
+## shuffle buffer (iterBatches, makeTfDataset), so the memory doesn't grow
+## with the number of positions.
+
+import os
+import csv
+import json
+import hashlib
+
+import numpy as np
+
+from othello import *
+from batch_replay import replayGames, recordToSquares, MAX_MOVES
+from wtb_reader import readWtb, toSquares
+from othello_simulator import searchMove
+
+
+DATASET_VERSION = 1
+DEFAULT_CACHE_DIR = ".dataset_cache"
+
+POSITION_DTYPE = np.dtype([
+    ("game", "<i4"),               # index of the game in the source
+    ("ply", "i1"),                 # number of moves played before
+    ("side", "i1"),                # player who moved next, -1 at the end
+    ("passed", "?"),               # the other player passed before
+    ("length", "i1"),              # number of moves of the game
+    ("dark_score", "i1"),          # number of discs at the end
+    ("light_score", "i1"),
+    ("theoretical_score", "i1"),   # dark discs by perfect moves, -1 if unknown
+    ("target", "<f4"),             # label given for the position, or NaN
+])
+
+
+def readGames(source):
+    """Read games of the source file and get (squares, theoretical scores,
+       targets, depth). squares is (N, 60) array of moves (-1 for the end),
+       targets is (N, 60) float32 labels given for each position (NaN if
+       not given) and depth is the depth of the theoretical scores (None if
+       unknown)."""
+    if source.endswith(".wtb"):
+        header, games = readWtb(source)
+        squares = toSquares(games["moves"])
+        targets = np.full(squares.shape, np.nan, dtype=np.float32)
+        return (squares, games["theoretical_score"].copy(), targets,
+                int(header["depth"]))
+
+    with open(source) as f:
+        first = f.readline()
+        if first.startswith("created year"):
+            # WTH csv file created by wtb_to_csv.py:
+            # header of wtb, names of columns and records
+            depth = int(first.split(",")[7].split(":")[1])
+            next(f)
+            rows = [(searchMove(row), row[4]) for row in csv.reader(f)
+                    if len(row) > 4]
+            records = [(toZeroBasedMoves(moves), int(theo))
+                       for moves, theo in rows
+                       if moves is not None and "" not in moves]
+            squares = np.array([recordToSquares(m) for m, _ in records],
+                               dtype=np.int8).reshape(-1, MAX_MOVES)
+            theoretical = np.array([t for _, t in records], dtype=np.int8)
+            targets = np.full(squares.shape, np.nan, dtype=np.float32)
+            return (squares, theoretical, targets, depth)
+
+        # csv file of records whose columns are "0" to "59" (moves),
+        # optionally "theoretical_score" and "l0" to "l59" (labels).
+        # lines before the names of the columns are skipped
+        f.seek(0)
+        reader = csv.reader(f)
+        for header in reader:
+            if "0" in header and "59" in header:
+                break
+        squares = []
+        theoretical = []
+        targets = []
+        for row in reader:
+            row = dict(zip(header, row))
+            squares.append(recordToSquares([row[f"{i}"] for i in range(60)]))
+            theoretical.append(int(row.get("theoretical_score") or -1))
+            labels = []
+            for i in range(60):
+                try:
+                    labels.append(float(row[f"l{i}"]))
+                except (KeyError, TypeError, ValueError):
+                    labels.append(np.nan)
+            targets.append(labels)
+        squares = np.array(squares, dtype=np.int8).reshape(-1, MAX_MOVES)
+        theoretical = np.array(theoretical, dtype=np.int8)
+        targets = np.array(targets, dtype=np.float32).reshape(-1, MAX_MOVES)
+        return (squares, theoretical, targets, None)
+
+def getDatasetKey(source, normalize_state=False, shard_size=1<<16):
+    """Get the key (hex digest) of the dataset of the source file and the
+       preprocessing options."""
+    h = hashlib.sha256()
+    options = {"version": DATASET_VERSION, "normalize_state": normalize_state,
+               "shard_size": shard_size}
+    h.update(json.dumps(options, sort_keys=True).encode("utf-8"))
+    with open(source, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:32]
+
+def _normalizeStates(states):
+    """Apply normalizeState to (M, 64) positions of normalized discs."""
+    # back to BLANK, BLACK, WHITE (index -1 is white)
+    discs = np.array([BLANK, BLACK, WHITE], dtype=np.int8)
+    result = np.empty_like(states)
+    for i, s in enumerate(discs[states].reshape(-1, 8, 8)):
+        result[i] = normalizeDisc(normalizeState(s)[1]).reshape(-1)
+    return result
+
+def buildDataset(source, cache_dir=DEFAULT_CACHE_DIR, normalize_state=False,
+                 shard_size=1<<16):
+    """Replay games of the source file and write the dataset into the
+       cache directory. Return the directory of the dataset."""
+    key = getDatasetKey(source, normalize_state, shard_size)
+    directory = os.path.join(cache_dir, key)
+    os.makedirs(directory, exist_ok=True)
+    manifest_file = os.path.join(directory, "manifest.json")
+    if os.path.exists(manifest_file):
+        # the dataset is incomplete until the manifest is written again
+        os.remove(manifest_file)
+
+    squares, theoretical, targets, depth = readGames(source)
+    positions, sides, passes, num_moves, valid = replayGames(squares)
+    # broken records are excluded
+    games = np.flatnonzero(valid)
+    final = positions[games, num_moves[games]]
+
+    # positions of each game: before every move and at the end
+    game_index = np.repeat(games, num_moves[games] + 1)
+    starts = np.cumsum(num_moves[games] + 1) - (num_moves[games] + 1)
+    plies = np.arange(len(game_index)) - np.repeat(starts, num_moves[games] + 1)
+    info = np.zeros(len(game_index), dtype=POSITION_DTYPE)
+    info["game"] = game_index
+    info["ply"] = plies
+    info["side"] = sides[game_index, plies]
+    info["passed"] = passes[game_index, plies]
+    info["length"] = num_moves[game_index]
+    info["dark_score"] = np.repeat(np.count_nonzero(final == 1, axis=1),
+                                   num_moves[games] + 1)
+    info["light_score"] = np.repeat(np.count_nonzero(final == -1, axis=1),
+                                    num_moves[games] + 1)
+    info["theoretical_score"] = theoretical[game_index]
+    info["target"] = np.where(plies < MAX_MOVES,
+                              targets[game_index, np.minimum(plies, MAX_MOVES-1)],
+                              np.nan)
+
+    num_shards = 0
+    for start in range(0, len(info), shard_size):
+        end = start + shard_size
+        states = positions[game_index[start:end], plies[start:end]]
+        if normalize_state:
+            states = _normalizeStates(states)
+        np.save(os.path.join(directory, f"states_{num_shards:05d}.npy"), states)
+        np.save(os.path.join(directory, f"info_{num_shards:05d}.npy"),
+                info[start:end])
+        num_shards += 1
+
+    manifest = {"version": DATASET_VERSION, "source": os.path.abspath(source),
+                "normalize_state": normalize_state, "shard_size": shard_size,
+                "depth": depth, "num_games": int(len(games)),
+                "num_broken_games": int(len(valid) - len(games)),
+                "num_positions": int(len(info)), "num_shards": num_shards}
+    with open(manifest_file, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return directory
+
+
+class PositionDataset():
+    """Positions of the cached datasets (shards are memory-mapped)"""
+
+    def __init__(self, directories):
+        if isinstance(directories, str):
+            directories = [directories]
+        self.manifests = []
+        self.shards = []
+        for directory in directories:
+            with open(os.path.join(directory, "manifest.json")) as f:
+                manifest = json.load(f)
+            if manifest["version"] != DATASET_VERSION:
+                raise ValueError(f"{directory} is a dataset of version "
+                                 f"{manifest['version']}")
+            self.manifests.append(manifest)
+            for i in range(manifest["num_shards"]):
+                self.shards.append( (
+                    os.path.join(directory, f"states_{i:05d}.npy"),
+                    os.path.join(directory, f"info_{i:05d}.npy") ) )
+
+    def __len__(self):
+        return sum(m["num_positions"] for m in self.manifests)
+
+    def getShard(self, i):
+        """Get (states, info) of the i-th shard (memory-mapped)."""
+        states_file, info_file = self.shards[i]
+        return (np.load(states_file, mmap_mode="r"),
+                np.load(info_file, mmap_mode="r"))
+
+    def iterShards(self):
+        """Iterate over (states, info) of all shards."""
+        for i in range(len(self.shards)):
+            yield self.getShard(i)
+
+    def count(self, select):
+        """Count positions selected by select (see iterBatches)."""
+        return sum(int(np.count_nonzero(select(info)[0]))
+                   for _, info in self.iterShards())
+
+    def iterBatches(self, select, batch_size=32, shuffle_buffer=1<<16,
+                    rng=None, chunk_size=4096):
+        """Iterate over batches of (states, labels) of the positions.
+           select(info) returns (mask of positions to use, labels of all
+           positions). Shards are read lazily in random order and positions
+           are drawn at random from a buffer of shuffle_buffer positions
+           (no shuffle if shuffle_buffer is 0)."""
+        if rng is None:
+            rng = np.random.default_rng()
+        capacity = max(shuffle_buffer, batch_size) + chunk_size
+        buffer_x = None
+        buffer_y = None
+        size = 0
+
+        order = rng.permutation(len(self.shards)) if shuffle_buffer > 0 \
+                else range(len(self.shards))
+        for i in order:
+            states, info = self.getShard(i)
+            mask, labels = select(info)
+            indices = np.flatnonzero(mask)
+            labels = np.asarray(labels, dtype=np.float32)[indices]
+            for start in range(0, len(indices), chunk_size):
+                # reads only the selected rows of the mapped shard
+                x = states[indices[start:start+chunk_size]]
+                y = labels[start:start+chunk_size]
+                if buffer_x is None:
+                    buffer_x = np.empty( (capacity,) + x.shape[1:], x.dtype )
+                    buffer_y = np.empty( (capacity,) + y.shape[1:], y.dtype )
+                buffer_x[size:size+len(x)] = x
+                buffer_y[size:size+len(y)] = y
+                size += len(x)
+                while size >= max(shuffle_buffer, batch_size):
+                    x, y = self._takeBatch(buffer_x, buffer_y, size,
+                                           batch_size, rng, shuffle_buffer > 0)
+                    size -= batch_size
+                    yield (x, y)
+
+        # flush the buffer
+        while size > 0:
+            n = min(size, batch_size)
+            x, y = self._takeBatch(buffer_x, buffer_y, size, n, rng,
+                                   shuffle_buffer > 0)
+            size -= n
+            yield (x, y)
+
+    @staticmethod
+    def _takeBatch(buffer_x, buffer_y, size, n, rng, shuffle):
+        """Remove n positions from the buffer of size positions and return
+           them (at random if shuffle, otherwise the oldest ones)."""
+        if not shuffle:
+            x = buffer_x[:n].copy()
+            y = buffer_y[:n].copy()
+            buffer_x[:size-n] = buffer_x[n:size]
+            buffer_y[:size-n] = buffer_y[n:size]
+            return (x, y)
+        chosen = rng.choice(size, n, replace=False)
+        x = buffer_x[chosen]
+        y = buffer_y[chosen]
+        # fill the holes with the positions at the tail of the buffer
+        tail = np.arange(size-n, size)
+        holes = chosen[chosen < size-n]
+        movers = tail[~np.isin(tail, chosen)]
+        buffer_x[holes] = buffer_x[movers]
+        buffer_y[holes] = buffer_y[movers]
+        return (x, y)
+
+    def load(self):
+        """Get (states, info) of all positions (read into memory)."""
+        shards = list(self.iterShards())
+        if not shards:
+            return (np.zeros( (0, 64), dtype=np.int8 ),
+                    np.zeros(0, dtype=POSITION_DTYPE))
+        return (np.concatenate([s for s, _ in shards]),
+                np.concatenate([i for _, i in shards]))
+
+
+def openDataset(sources, cache_dir=DEFAULT_CACHE_DIR, normalize_state=False,
+                shard_size=1<<16, rebuild=False):
+    """Open the dataset of the source files, building the missing ones."""
+    if isinstance(sources, str):
+        sources = [sources]
+    directories = []
+    for source in sources:
+        key = getDatasetKey(source, normalize_state, shard_size)
+        directory = os.path.join(cache_dir, key)
+        if rebuild or not os.path.exists(os.path.join(directory,
+                                                      "manifest.json")):
+            print(f"build dataset of {source} in {directory}")
+            buildDataset(source, cache_dir, normalize_state, shard_size)
+        directories.append(directory)
+    return PositionDataset(directories)
+
+def makeTfDataset(dataset, select, batch_size=32, shuffle_buffer=1<<16,
+                  seed=None, prefetch=4):
+    """Make tf.data.Dataset of batches of (states, labels) streamed from the
+       dataset by iterBatches, which is prefetched while the model trains.
+       Each iteration (epoch) shuffles the positions again."""
+    import tensorflow as tf
+    rng = np.random.default_rng(seed)
+    tf_dataset = tf.data.Dataset.from_generator(
+        lambda: dataset.iterBatches(select, batch_size, shuffle_buffer, rng),
+        output_signature=(tf.TensorSpec(shape=(None, 64), dtype=tf.int8),
+                          tf.TensorSpec(shape=(None, 2), dtype=tf.float32)))
+    return tf_dataset.map(lambda x, y: (tf.cast(x, tf.float32), y)) \
+                     .prefetch(prefetch)
@@ -0,0 +1,122 @@
+## Database of positions in a binary file of fixed-size records.
+## Each record has the zobrist key of the position, bitboards of the
+## player and the opponent, the color of the player (side) and a payload
+## of any numpy dtype. Records are sorted by key, so the file is opened by
+## numpy.memmap without reading it and a position is found by binary
+## search, which touches only a few pages (shared by all processes through
+## the OS cache).
+## File: header (HEADER_BYTES, magic + json) followed by the records.
+
+import json
+import bisect
+
+import numpy as np
+
+from zobrist import getZobristTable
+
+
+MAGIC = b"OTHPDB01"
+HEADER_BYTES = 256
+
+
+def getRecordDtype(payload_dtype):
+    """Get the dtype of records with the payload dtype."""
+    return np.dtype([("key", "<u8"), ("player", "<u8"), ("opponent", "<u8"),
+                     ("side", "u1"), ("payload", np.dtype(payload_dtype))])
+
+def hashPositions(players, opponents, sides, size=8):
+    """Get zobrist keys of arrays of positions (same as hashBitboards)."""
+    table = getZobristTable(size)
+    players = np.asarray(players, dtype=np.uint64)
+    opponents = np.asarray(opponents, dtype=np.uint64)
+    sides = np.asarray(sides)
+    blacks = np.where(sides == 0, players, opponents)
+    whites = np.where(sides == 0, opponents, players)
+    keys = np.where(sides == 1, np.uint64(table.side), np.uint64(0))
+    for sq in range(size*size):
+        bit = np.uint64(sq)
+        keys ^= np.where((blacks >> bit) & np.uint64(1),
+                         np.uint64(table.disc[0][sq]), np.uint64(0))
+        keys ^= np.where((whites >> bit) & np.uint64(1),
+                         np.uint64(table.disc[1][sq]), np.uint64(0))
+    return keys
+
+
+class PositionDatabase():
+
+    def __init__(self, filename):
+        """Open the database file (records are not read until accessed)."""
+        with open(filename, "rb") as f:
+            header = f.read(HEADER_BYTES)
+        if header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{filename} is not a position database")
+        info = json.loads(header[len(MAGIC):].rstrip(b"\0").decode("utf-8"))
+        self.size = info["size"]
+        self.zobrist = getZobristTable(self.size)
+        payload_dtype = np.dtype([tuple(field) for field in info["payload"]]) \
+                        if isinstance(info["payload"], list) \
+                        else np.dtype(info["payload"])
+        self.dtype = getRecordDtype(payload_dtype)
+        if info["count"] > 0:
+            self.records = np.memmap(filename, dtype=self.dtype, mode="r",
+                                     offset=HEADER_BYTES,
+                                     shape=(info["count"],))
+        else:
+            self.records = np.zeros(0, dtype=self.dtype)
+        self.keys = self.records["key"]
+
+    def __len__(self):
+        return len(self.records)
+
+    @staticmethod
+    def create(filename, players, opponents, sides, payloads, size=8):
+        """Write a database of positions (arrays of bitboards of the player
+           and the opponent, colors of the player and payloads)."""
+        if size * size > 64:
+            raise ValueError("only boards up to 64 squares are supported")
+        payloads = np.asarray(payloads)
+        records = np.zeros(len(payloads), dtype=getRecordDtype(payloads.dtype))
+        records["player"] = np.asarray(players, dtype=np.uint64)
+        records["opponent"] = np.asarray(opponents, dtype=np.uint64)
+        records["side"] = sides
+        records["payload"] = payloads
+        records["key"] = hashPositions(records["player"], records["opponent"],
+                                       records["side"], size)
+        records = records[np.argsort(records["key"], kind="stable")]
+
+        descr = payloads.dtype.descr if payloads.dtype.names \
+                else payloads.dtype.str
+        header = MAGIC + json.dumps({"size": size, "count": len(records),
+                                     "payload": descr}).encode("utf-8")
+        if len(header) > HEADER_BYTES:
+            raise ValueError("payload dtype is too complex for the header")
+        with open(filename, "wb") as f:
+            f.write(header.ljust(HEADER_BYTES, b"\0"))
+            f.write(records.tobytes())
+
+    def findAll(self, player, opponent, side=0):
+        """Get payloads of all records of the position (may be empty)."""
+        if side == 0:
+            key = self.zobrist.hashBitboards(player, opponent, side)
+        else:
+            key = self.zobrist.hashBitboards(opponent, player, side)
+        # bisect reads only the keys it compares (np.searchsorted would
+        # copy the whole column of the mapped file)
+        key = np.uint64(key)
+        start = bisect.bisect_left(self.keys, key)
+        end = bisect.bisect_right(self.keys, key, lo=start)
+        if start == end:
+            return self.records["payload"][0:0]
+        records = self.records[start:end]
+        # different positions may have the same key
+        same = (records["player"] == np.uint64(player)) & \
+               (records["opponent"] == np.uint64(opponent)) & \
+               (records["side"] == side)
+        return records["payload"][same]
+
+    def find(self, player, opponent, side=0):
+        """Get the payload of the position, or None if not found."""
+        payloads = self.findAll(player, opponent, side)
+        if len(payloads) == 0:
+            return None
+        return payloads[0]
@@ -0,0 +1,80 @@
+## Parameters of Multi-ProbCut, the selective pruning of alpha-beta search.
+## The score of a deep search is predicted from the score of a shallow
+## search by a linear regression (deep = a * shallow + b, with standard
+## deviation sigma of the error), so a node is cut without the deep search
+## when the shallow search says that the deep score is out of the window
+## with high probability. Several shallow depths can be checked for each
+## depth, and the regression is fitted for each stage of the game (number
+## of discs) and each order of the agent, in sight of the agent.
+
+import json
+
+import numpy as np
+
+
+class ProbCut():
+
+    # stages with fewer samples than this are not cut
+    MIN_SAMPLES = 10
+
+    def __init__(self, checks=None, stage_width=4):
+        # checks: list of {"depth", "shallow", "t", "params"}, where
+        # params[order][stage] is [a, b, sigma] or None
+        self.checks = checks or []
+        self.stage_width = stage_width
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename) as f:
+            data = json.load(f)
+        return cls(data["checks"], data["stage_width"])
+
+    def save(self, filename):
+        with open(filename, "w") as f:
+            json.dump({"stage_width": self.stage_width, "checks": self.checks},
+                      f, indent=1)
+
+    def getStage(self, num_discs):
+        return num_discs // self.stage_width
+
+    def getChecks(self, depth, order, num_discs):
+        """Get list of (shallow depth, t, a, b, sigma) to check before
+           the search of depth."""
+        stage = self.getStage(num_discs)
+        checks = []
+        for check in self.checks:
+            if check["depth"] != depth:
+                continue
+            params = check["params"][str(order)]
+            if stage < len(params) and params[stage] is not None:
+                a, b, sigma = params[stage]
+                checks.append( (check["shallow"], check["t"], a, b, sigma) )
+        return checks
+
+    def fit(self, depth, shallow, t, samples, max_discs=64):
+        """Fit the regression of the check from samples of
+           (order, number of discs, shallow score, deep score)
+           and add (or replace) the check."""
+        num_stages = self.getStage(max_discs) + 1
+        params = {}
+        for order in (0, 1):
+            params[str(order)] = [None] * num_stages
+            for stage in range(num_stages):
+                xs = []
+                ys = []
+                for o, num_discs, x, y in samples:
+                    if o == order and self.getStage(num_discs) == stage and \
+                       np.isfinite(x) and np.isfinite(y):
+                        xs.append(x)
+                        ys.append(y)
+                if len(xs) < self.MIN_SAMPLES or np.ptp(xs) == 0:
+                    continue
+                a, b = np.polyfit(xs, ys, 1)
+                if a <= 0:
+                    continue
+                sigma = np.std(np.array(ys) - (a*np.array(xs) + b))
+                params[str(order)][stage] = [float(a), float(b), float(sigma)]
+        self.checks = [c for c in self.checks
+                       if (c["depth"], c["shallow"]) != (depth, shallow)]
+        self.checks.append({"depth": depth, "shallow": shallow, "t": t,
+                            "params": params})
@@ -0,0 +1,134 @@
+## Transposition table of fixed size for searching.
+## Entries are kept in numpy arrays and grouped into buckets of 2 slots:
+## the first slot keeps the deepest entry (depth-preferred) and the second
+## slot is always replaced. The key of each slot is stored XOR-ed with the
+## entry data, so an entry broken by a concurrent writer just looks like
+## a different position.
+## The arrays may be placed in a shared buffer (e.g. shared_memory of
+## multiprocessing), so that processes searching in parallel share one
+## table without locks.
+
+import numpy as np
+
+
+# bound types of stored values
+EXACT = 0
+LOWER = 1   # value >= stored value (fail high)
+UPPER = 2   # value <= stored value (fail low)
+
+# codes of moves which are not a square
+MOVE_NONE = 255
+MOVE_PASS = 254
+
+ENTRY_BYTES = 24   # key, value and info (8 bytes each)
+
+
+def getNumSlots(size_mb):
+    """Number of entries of the table within the memory budget
+       (the largest power of 2 buckets)."""
+    num_entries = max(2, int(size_mb * 2**20) // ENTRY_BYTES)
+    num_buckets = 1 << (num_entries // 2).bit_length() - 1
+    return num_buckets * 2
+
+def getBufferSize(size_mb):
+    """Bytes of the buffer needed to hold the table of size_mb."""
+    return getNumSlots(size_mb) * ENTRY_BYTES
+
+
+class TranspositionTable():
+
+    def __init__(self, size_mb=16, buffer=None):
+        # buffer: memory of at least getBufferSize(size_mb) bytes to place
+        # the entries in (the entries in it are kept, None to allocate)
+        num_slots = getNumSlots(size_mb)
+        self.size_mb = size_mb
+        self.mask = num_slots // 2 - 1
+        if buffer is None:
+            self.keys = np.zeros(num_slots, dtype=np.uint64)
+            self.values = np.zeros(num_slots, dtype=np.float64)
+            self.infos = np.zeros(num_slots, dtype=np.uint64)
+        else:
+            self.keys = np.ndarray(num_slots, dtype=np.uint64, buffer=buffer)
+            self.values = np.ndarray(num_slots, dtype=np.float64, buffer=buffer,
+                                     offset=num_slots*8)
+            self.infos = np.ndarray(num_slots, dtype=np.uint64, buffer=buffer,
+                                    offset=num_slots*16)
+        self.value_bits = self.values.view(np.uint64)
+        self.generation = 0
+        self.resetStats()
+
+    def release(self):
+        """Drop the arrays (needed before the shared buffer is closed)."""
+        self.keys = self.values = self.value_bits = self.infos = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def resetStats(self):
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0   # misses whose bucket is used by other positions
+        self.stores = 0
+
+    def stats(self):
+        """Get counters of probes and stores."""
+        probes = self.hits + self.misses
+        return {
+            "entries": len(self.keys),
+            "size_mb": len(self.keys) * ENTRY_BYTES / 2**20,
+            "hits": self.hits,
+            "misses": self.misses,
+            "collisions": self.collisions,
+            "stores": self.stores,
+            "hit_rate": self.hits / probes if probes else 0.0,
+        }
+
+    def clear(self):
+        self.keys.fill(0)
+        self.values.fill(0)
+        self.infos.fill(0)
+        self.generation = 0
+
+    def newSearch(self):
+        """Notify the start of a new search, which makes the entries of
+           older searches replaceable."""
+        self.generation = (self.generation + 1) & 0xFF
+
+    def probe(self, key):
+        """Get (value, bound, depth, move) stored for the key, or None."""
+        slot = (key & self.mask) << 1
+        occupied = False
+        for i in (slot, slot+1):
+            info = int(self.infos[i])
+            if info == 0:
+                continue
+            occupied = True
+            if int(self.keys[i]) ^ info ^ int(self.value_bits[i]) == key:
+                self.hits += 1
+                # info: depth+1 (8 bits) | bound (2 bits) | move (8 bits) |
+                #       generation (8 bits)
+                return (float(self.values[i]), (info >> 8) & 0x3,
+                        (info & 0xFF) - 1, (info >> 10) & 0xFF)
+        self.misses += 1
+        if occupied:
+            self.collisions += 1
+        return None
+
+    def store(self, key, value, bound, depth, move=MOVE_NONE):
+        """Store the result of the search of the position."""
+        slot = (key & self.mask) << 1
+        # depth-preferred slot is replaced by the same position, deeper
+        # (or equally deep) search or any search after the entry's search
+        info = int(self.infos[slot])
+        if info == 0 or \
+           int(self.keys[slot]) ^ info ^ int(self.value_bits[slot]) == key or \
+           (info & 0xFF) - 1 <= depth or (info >> 18) != self.generation:
+            i = slot
+        else:
+            i = slot + 1
+        info = (min(depth, 254) + 1) | (bound << 8) | (move << 10) | \
+               (self.generation << 18)
+        self.values[i] = value
+        self.infos[i] = info
+        self.keys[i] = key ^ info ^ int(self.value_bits[i])
+        self.stores += 1
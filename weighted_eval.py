@@ -0,0 +1,70 @@
+## Weighted count of discs, which gives weights to the discs on the edges
+## and the corners (the evaluation of CornerWeightedMinMaxOthelloAgent).
+## The count is a dot product of the board with a weight table, so a stack
+## of boards is counted at once, and bitboards are counted by popcounts
+## of the masks of squares with the same weight.
+
+import numpy as np
+
+import bitboard
+from othello import WHITE, BLACK
+
+
+INTERIOR_WEIGHT = 1
+EDGE_WEIGHT = 5
+CORNER_WEIGHT = 10
+
+_weight_tables = {}
+_mask_tables = {}
+
+def getSquareWeights(size=8):
+    """Get weights of the squares as a flat array (cached by size)."""
+    try:
+        return _weight_tables[size]
+    except KeyError:
+        pass
+    last = size - 1
+    weights = np.full((size, size), INTERIOR_WEIGHT, dtype=np.float64)
+    weights[0, :] = weights[last, :] = EDGE_WEIGHT
+    weights[:, 0] = weights[:, last] = EDGE_WEIGHT
+    weights[0, 0] = weights[0, last] = CORNER_WEIGHT
+    weights[last, 0] = weights[last, last] = CORNER_WEIGHT
+    _weight_tables[size] = weights.reshape(-1)
+    return _weight_tables[size]
+
+def getWeightMasks(size=8):
+    """Get ((bitmask of squares, weight), ...) for bitboards (cached by size)."""
+    try:
+        return _mask_tables[size]
+    except KeyError:
+        pass
+    masks = {}
+    for sq, weight in enumerate(getSquareWeights(size)):
+        masks[int(weight)] = masks.get(int(weight), 0) | (1 << sq)
+    _mask_tables[size] = tuple( (mask, weight) for weight, mask in masks.items() )
+    return _mask_tables[size]
+
+
+def weightedScore(state):
+    """Get weighted numbers of discs (dark, light) of the state."""
+    counts = np.bincount(state.reshape(-1), weights=getSquareWeights(state.shape[0]),
+                         minlength=BLACK+1)
+    return (counts[BLACK], counts[WHITE])
+
+def weightedScores(states):
+    """Get weighted numbers of discs of a stack of states as (N, 2) array
+       of (dark, light)."""
+    states = np.asarray(states)
+    flat = states.reshape(len(states), -1)
+    weights = getSquareWeights(states.shape[1])
+    return np.stack([(flat == BLACK) @ weights, (flat == WHITE) @ weights],
+                    axis=1)
+
+def weightedScoreBitboards(black, white, size=8):
+    """Get weighted numbers of discs (dark, light) of bitboards."""
+    dark = 0
+    light = 0
+    for mask, weight in getWeightMasks(size):
+        dark += weight * bitboard.popcount(black & mask)
+        light += weight * bitboard.popcount(white & mask)
+    return (dark, light)
@@ -0,0 +1,74 @@
+## Reader of WTB files (game records of WTHOR database) into numpy arrays.
+## A file is a 16-byte header followed by 68-byte game records, which are
+## read at once by numpy structured dtypes.
+## A move byte is 10*(row+1) + (col+1), or 0 after the end of the game.
+
+import numpy as np
+
+
+HEADER_DTYPE = np.dtype([
+    ("created_century", "i1"),   # e.g. 20 of 2021
+    ("created_year", "i1"),      # e.g. 21 of 2021
+    ("created_month", "i1"),
+    ("created_day", "i1"),
+    ("num_games", "<i4"),
+    ("num_records", "<i2"),      # must be 0 in wtb file
+    ("year", "<i2"),             # year in which games took place
+    ("board_size", "i1"),        # 0 or 8 means 8
+    ("match_type", "i1"),        # must be 0
+    # If the black-disc player chose perfect moves from this depth
+    # (number of blank squares), the score of black-disc will be
+    # 'theoretical score'
+    ("depth", "i1"),
+    ("padding", "i1"),
+])
+
+GAME_DTYPE = np.dtype([
+    ("tournament", "<i2"),
+    ("dark_player", "<i2"),
+    ("light_player", "<i2"),
+    ("dark_score", "i1"),         # number of dark discs at the end
+    ("theoretical_score", "i1"),  # dark discs by perfect moves
+    ("moves", "i1", (60,)),
+])
+
+NO_MOVE = -1
+
+
+def readWtb(filename, mmap=False):
+    """Read (header, games) from the wtb file. games is a structured array
+       of GAME_DTYPE, memory-mapped if mmap is True."""
+    header = np.fromfile(filename, dtype=HEADER_DTYPE, count=1)[0]
+    num_games = int(header["num_games"])
+    if mmap:
+        games = np.memmap(filename, dtype=GAME_DTYPE, mode="r",
+                          offset=HEADER_DTYPE.itemsize, shape=(num_games,))
+    else:
+        games = np.fromfile(filename, dtype=GAME_DTYPE, count=num_games,
+                            offset=HEADER_DTYPE.itemsize)
+    return (header, games)
+
+def toSquares(moves, size=8):
+    """Convert move bytes (any shape) to square indices row*size + col
+       (int8, NO_MOVE for no move)."""
+    moves = np.asarray(moves)
+    rows = moves // 10 - 1
+    cols = moves % 10 - 1
+    return np.where(moves > 0, rows*size + cols, NO_MOVE).astype(np.int8)
+
+def iterWtbFiles(filenames, mmap=False):
+    """Iterate over (filename, header, games) of the wtb files."""
+    for filename in filenames:
+        header, games = readWtb(filename, mmap)
+        yield (filename, header, games)
+
+def loadWtbFiles(filenames):
+    """Read games of all wtb files and return (squares, games), where
+       squares is (N, 60) int8 array of moves (see toSquares) and games is
+       the structured array of all records (metadata columns)."""
+    games = [games for _, _, games in iterWtbFiles(filenames)]
+    if games:
+        games = np.concatenate(games)
+    else:
+        games = np.zeros(0, dtype=GAME_DTYPE)
+    return (toSquares(games["moves"]), games)
@@ -1,9 +1,8 @@
 import sys
 import argparse
 
-from struct import *
-
 from othello import *
+from wtb_reader import readWtb
 
 
 parser = argparse.ArgumentParser(
@@ -18,12 +17,13 @@ args = parser.parse_args()
 
 wtb_file = args.infile
 csv_file = args.outfile
+# header and all matches are read at once (see wtb_reader.py)
+header, matches = readWtb(wtb_file)
+header = header.tolist()
 try:
-    infile = open(wtb_file, mode='rb')
     outfile = open(csv_file, mode='w')
 
-    ## firstly, read header and write them to csv file ##
-    header = unpack('<bbbbihhbbbb', infile.read(16))  # little-endian
+    ## firstly, write header to csv file ##
     
     created_year = str(header[0]) + str(header[1])
     created_date = str(header[2]) + str(header[3])
@@ -61,29 +61,20 @@ try:
     outfile.writelines("59\n")
 
     # read data and write it to the csv file
-    for i in range(num_match):
-        # first 8-byte data tells information about the match
-        match_data = unpack('<hhhbb', infile.read(8))
-        tournament_id = match_data[0]
-        dark_player_id = match_data[1]
-        light_player_id = match_data[2]
-        dark_score = match_data[3]       # implies the result of the match
-        theoretical_score = match_data[4] # best score by perfect moves
+    # 2-digit strings of move bytes, e.g. "56" -> "4-5" (0-based)
+    move_strings = {m: f"{m//10-1}-{m%10-1}" for m in range(1, 100)}
+    move_strings[0] = "---"  # the game is already over
+    for match in matches.tolist():
+        tournament_id, dark_player_id, light_player_id, \
+            dark_score, theoretical_score, move_bytes = match
         outfile.writelines(f"{tournament_id},")
         outfile.writelines(f"{dark_player_id},")
         outfile.writelines(f"{light_player_id},")
-        outfile.writelines(f"{dark_score},")
-        outfile.writelines(f"{theoretical_score},")
-        
-        # latter 60-byte data represents moves
-        moves = []
-        for j in range(60):
-            move = str(unpack('b', infile.read(1))[0]).zfill(2)
-            if move == "00": # the game is already over
-                moves.append("---")
-            else:
-                moves.append(f"{int(move[0])-1}-{int(move[1])-1}")
-        
+        outfile.writelines(f"{dark_score},")      # implies the result
+        outfile.writelines(f"{theoretical_score},")  # best score by perfect moves
+
+        moves = [move_strings[m] for m in move_bytes]
+
         if args.with_scores:
             all_states = getAllStatesFromRecord(moves)
             scores = Othello.smScore(all_states[-1])
@@ -94,5 +85,4 @@ try:
             
 
 finally:
-    infile.close()
     outfile.close()
@@ -0,0 +1,58 @@
+## Zobrist hashing of othello positions.
+## The key of a position is XOR of random 64-bit numbers of all discs
+## (square and color) and of the side to move, so it can be updated
+## incrementally by XOR-ing the numbers of the changed discs.
+## Colors are indexed by player (0: dark/black, 1: light/white).
+
+import random
+
+import bitboard
+
+
+# keys are generated from a fixed seed so that they are the same
+# in every process (e.g. keys saved in files remain valid)
+SEED = 20210317
+
+class ZobristTable():
+
+    def __init__(self, size):
+        rng = random.Random(SEED + size)
+        self.size = size
+        # disc[player][sq]: number of the disc of the player on sq
+        self.disc = [[rng.getrandbits(64) for _ in range(size*size)]
+                     for _ in range(2)]
+        # flip[sq]: number to xor when the disc on sq is reversed
+        self.flip = [b ^ w for b, w in zip(self.disc[0], self.disc[1])]
+        # xored when the light player is to move
+        self.side = rng.getrandbits(64)
+
+    def hashBitboards(self, black, white, player):
+        """Calculate the key of the position from scratch."""
+        key = self.side if player == 1 else 0
+        for sq in bitboard.iterBits(black):
+            key ^= self.disc[0][sq]
+        for sq in bitboard.iterBits(white):
+            key ^= self.disc[1][sq]
+        return key
+
+    def updateKey(self, key, player, sq, flipped):
+        """Get the key after player put a disc on sq and reversed flipped
+           squares (sq is None for pass). The side to move is switched."""
+        key ^= self.side
+        if sq is None:
+            return key
+        key ^= self.disc[player][sq]
+        for f in flipped:
+            key ^= self.flip[f]
+        return key
+
+
+_tables = {}
+
+def getZobristTable(size=8):
+    """Get the table of random numbers of the board size (cached)."""
+    try:
+        return _tables[size]
+    except KeyError:
+        _tables[size] = ZobristTable(size)
+        return _tables[size]